@@ -14,37 +14,51 @@ import hashlib
 from typing import List, Tuple, Optional
 
 
-class MerkleNode:
-    """Represents a node in the Merkle tree."""
-
-    def __init__(self, hash_value: str, left=None, right=None, data: Optional[str] = None):
-        self.hash = hash_value
-        self.left = left
-        self.right = right
-        self.data = data  # Only set for leaf nodes
-
-    def is_leaf(self) -> bool:
-        return self.data is not None
-
-
 class MerkleTree:
-    """Builds and manages a Merkle tree."""
+    """
+    Builds and manages a Merkle tree.
+
+    The tree is stored level by level as flat lists of raw digests
+    (levels[0] = leaves, levels[-1] = [root]) rather than linked node
+    objects. The children of levels[k][i] are levels[k-1][2i] and
+    levels[k-1][2i+1] (the last index repeats on an odd-length level).
+    """
 
     def __init__(self):
-        self.root = None
+        self.levels: List[List[bytes]] = []
 
     @staticmethod
-    def _hash_data(data: str) -> str:
+    def _hash_data(data: str) -> bytes:
         """Hash a piece of data (leaf node)."""
-        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+        return hashlib.sha256(data.encode('utf-8')).digest()
+
+    @staticmethod
+    def _hash_leaves(data_items: List[str]) -> List[bytes]:
+        """Hash all leaf items in one pass (sha256 bound once, no per-item method lookup)."""
+        sha256 = hashlib.sha256
+        return [sha256(item.encode('utf-8')).digest() for item in data_items]
 
     @staticmethod
-    def _hash_pair(left_hash: str, right_hash: str) -> str:
-        """Hash a pair of hashes (internal node)."""
-        combined = f"{left_hash}{right_hash}".encode('utf-8')
-        return hashlib.sha256(combined).hexdigest()
+    def _hash_pair(left_hash: bytes, right_hash: bytes) -> bytes:
+        """Hash a pair of hashes (internal node): 64 raw bytes in, one digest out."""
+        return hashlib.sha256(left_hash + right_hash).digest()
 
-    def build_from_data(self, data_items: List[str]) -> 'MerkleNode':
+    @staticmethod
+    def _hash_level(hashes: List[bytes]) -> List[bytes]:
+        """
+        Hash one tree level into its parent level.
+        Pairs are hashed back to back; an odd last hash is paired with itself
+        (by reference, without copying the level to pad it).
+        """
+        sha256 = hashlib.sha256
+        parents = [sha256(left + right).digest()
+                   for left, right in zip(hashes[0::2], hashes[1::2])]
+        if len(hashes) % 2:
+            last = hashes[-1]
+            parents.append(sha256(last + last).digest())
+        return parents
+
+    def build_from_data(self, data_items: List[str]) -> str:
         """
         Build a Merkle tree from a list of data items.
 
@@ -52,51 +66,29 @@ class MerkleTree:
             data_items: List of strings to hash into the tree
 
         Returns:
-            Root node of the tree
+            Hex string of the root hash
         """
         if not data_items:
-            # Empty tree
-            empty_hash = hashlib.sha256(b"empty").hexdigest()
-            self.root = MerkleNode(empty_hash)
-            return self.root
-
-        # Create leaf nodes
-        nodes = []
-        for item in data_items:
-            hash_value = self._hash_data(item)
-            node = MerkleNode(hash_value, data=item)
-            nodes.append(node)
-
-        # Build tree bottom-up by pairing nodes
-        while len(nodes) > 1:
-            next_level = []
-
-            # Process pairs of nodes
-            for i in range(0, len(nodes), 2):
-                left = nodes[i]
-
-                if i + 1 < len(nodes):
-                    # We have a pair
-                    right = nodes[i + 1]
-                    hash_value = self._hash_pair(left.hash, right.hash)
-                    parent = MerkleNode(hash_value, left, right)
-                else:
-                    # Odd number of nodes, duplicate the last one
-                    hash_value = self._hash_pair(left.hash, left.hash)
-                    parent = MerkleNode(hash_value, left, left)
-
-                next_level.append(parent)
-
-            nodes = next_level
-
-        self.root = nodes[0]
-        return self.root
+            # Empty tree: a root with no leaves
+            self.levels = [[], [hashlib.sha256(b"empty").digest()]]
+            return self.get_root_hash()
+
+        # Leaf level (all leaves hashed in one batch)
+        level = self._hash_leaves(data_items)
+        self.levels = [level]
+
+        # Build tree bottom-up, one level per _hash_level call
+        while len(level) > 1:
+            level = self._hash_level(level)
+            self.levels.append(level)
+
+        return self.get_root_hash()
 
     def get_root_hash(self) -> str:
-        """Get the root hash of the tree."""
-        if self.root is None:
+        """Get the root hash of the tree (hex string)."""
+        if not self.levels:
             raise ValueError("Tree not built yet")
-        return self.root.hash
+        return self.levels[-1][0].hex()
 
     def verify_leaf(self, data: str, proof: List[Tuple[str, str]]) -> bool:
         """
@@ -105,20 +97,21 @@ class MerkleTree:
         Args:
             data: The data item to verify
             proof: List of (hash, position) where position is 'left' or 'right'
-                  These are the sibling hashes along the path to root
+                  These are the sibling hashes (hex) along the path to root
 
         Returns:
             True if data is in tree, False otherwise
         """
         current_hash = self._hash_data(data)
 
-        for sibling_hash, position in proof:
+        for sibling_hex, position in proof:
+            sibling_hash = bytes.fromhex(sibling_hex)
             if position == 'left':
                 current_hash = self._hash_pair(sibling_hash, current_hash)
             else:  # right
                 current_hash = self._hash_pair(current_hash, sibling_hash)
 
-        return current_hash == self.root.hash
+        return current_hash == self.levels[-1][0]
 
     def get_proof(self, data: str) -> Optional[List[Tuple[str, str]]]:
         """
@@ -128,36 +121,28 @@ class MerkleTree:
             data: The data item to generate proof for
 
         Returns:
-            List of (sibling_hash, position) pairs, or None if data not found
+            List of (sibling_hash_hex, position) pairs, or None if data not found
         """
-        def find_proof(node: MerkleNode, target_hash: str, proof: List) -> bool:
-            if node.is_leaf():
-                return node.hash == target_hash
-
-            # Try left subtree
-            if node.left and find_proof(node.left, target_hash, proof):
-                if node.right:
-                    proof.append((node.right.hash, 'right'))
-                return True
-
-            # Try right subtree
-            if node.right and find_proof(node.right, target_hash, proof):
-                if node.left:
-                    proof.append((node.left.hash, 'left'))
-                return True
-
-            return False
+        if not self.levels:
+            return None
 
-        if self.root is None:
+        try:
+            index = self.levels[0].index(self._hash_data(data))
+        except ValueError:
             return None
 
-        target_hash = self._hash_data(data)
+        # Walk leaf-to-root by index: the sibling of i is i ^ 1
         proof = []
-
-        if find_proof(self.root, target_hash, proof):
-            return proof  # Already in leaf-to-root order
-
-        return None
+        for level in self.levels[:-1]:
+            if index % 2:
+                proof.append((level[index - 1].hex(), 'left'))
+            else:
+                # Odd last node is paired with itself
+                sibling = level[index + 1] if index + 1 < len(level) else level[index]
+                proof.append((sibling.hex(), 'right'))
+            index //= 2
+
+        return proof
 
 
 def merkle_root_from_files(file_data: List[Tuple[str, str]]) -> str:
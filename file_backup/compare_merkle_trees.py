@@ -110,117 +110,116 @@ class MerkleTreeComparator:
     def _compare_nodes(self, path: str, source_node: MerkleNode, target_node: MerkleNode,
                        output: List[str], depth: int, max_depth: int,
                        show_identical: bool, only_show_dirs: bool):
-        """Recursively compare nodes and build output"""
-
-        # Check depth limit
-        if max_depth is not None and depth > max_depth:
-            return
-
-        indent = "  " * depth
-        prefix = ""
-        status_symbol = ""
-
-        # Determine difference type
-        if source_node is None and target_node is None:
-            return  # Both missing, shouldn't happen
-
-        elif source_node is None:
-            # Only in target
-            diff_type = DiffType.ONLY_IN_TARGET
-            status_symbol = "+"
-            prefix = f"{indent}{status_symbol} "
+        """
+        Compare nodes depth-first and build output.
+        Uses an explicit stack (children pushed in reverse sorted order) so the
+        output order matches a recursive pre-order walk without the recursion.
+        """
+        stack = [(path, source_node, target_node, depth)]
+
+        while stack:
+            path, source_node, target_node, depth = stack.pop()
+
+            # Check depth limit
+            if max_depth is not None and depth > max_depth:
+                continue
+
+            indent = "  " * depth
+            prefix = ""
+            status_symbol = ""
+
+            # Determine difference type
+            if source_node is None and target_node is None:
+                continue  # Both missing, shouldn't happen
+
+            elif source_node is None:
+                # Only in target
+                diff_type = DiffType.ONLY_IN_TARGET
+                status_symbol = "+"
+                prefix = f"{indent}{status_symbol} "
+
+                if target_node.is_dir:
+                    self.stats.only_in_target_dirs += 1
+                    output.append(f"{prefix}{target_node.name}/ ({target_node.file_count:,} files) [target only]")
+                else:
+                    self.stats.only_in_target_files += 1
+                    if not only_show_dirs:
+                        output.append(f"{prefix}{target_node.name} [target only]")
+
+            elif target_node is None:
+                # Only in source
+                diff_type = DiffType.ONLY_IN_SOURCE
+                status_symbol = "-"
+                prefix = f"{indent}{status_symbol} "
 
-            if target_node.is_dir:
-                self.stats.only_in_target_dirs += 1
-                output.append(f"{prefix}{target_node.name}/ ({target_node.file_count:,} files) [target only]")
-            else:
-                self.stats.only_in_target_files += 1
-                if not only_show_dirs:
-                    output.append(f"{prefix}{target_node.name} [target only]")
-
-        elif target_node is None:
-            # Only in source
-            diff_type = DiffType.ONLY_IN_SOURCE
-            status_symbol = "-"
-            prefix = f"{indent}{status_symbol} "
-
-            if source_node.is_dir:
-                self.stats.only_in_source_dirs += 1
-                output.append(f"{prefix}{source_node.name}/ ({source_node.file_count:,} files) [source only]")
-            else:
-                self.stats.only_in_source_files += 1
-                if not only_show_dirs:
-                    output.append(f"{prefix}{source_node.name} [source only]")
+                if source_node.is_dir:
+                    self.stats.only_in_source_dirs += 1
+                    output.append(f"{prefix}{source_node.name}/ ({source_node.file_count:,} files) [source only]")
+                else:
+                    self.stats.only_in_source_files += 1
+                    if not only_show_dirs:
+                        output.append(f"{prefix}{source_node.name} [source only]")
+
+            elif source_node.merkle_hash == target_node.merkle_hash:
+                # Identical
+                diff_type = DiffType.IDENTICAL
+                status_symbol = "✓"
 
-        elif source_node.merkle_hash == target_node.merkle_hash:
-            # Identical
-            diff_type = DiffType.IDENTICAL
-            status_symbol = "✓"
+                if source_node.is_dir:
+                    self.stats.identical_dirs += 1
+                else:
+                    self.stats.identical_files += 1
+
+                if show_identical:
+                    prefix = f"{indent}{status_symbol} " 
+                    if source_node.is_dir:
+                        output.append(f"{prefix}{source_node.name}/ ({source_node.file_count:,} files) [identical]")
+                    elif not only_show_dirs:
+                        output.append(f"{prefix}{source_node.name} [identical]")
+                continue  # Don't descend into identical directories
 
-            if source_node.is_dir:
-                self.stats.identical_dirs += 1
             else:
-                self.stats.identical_files += 1
+                # Modified (hashes differ)
+                diff_type = DiffType.MODIFIED
+                status_symbol = "✗"
+                prefix = f"{indent}{status_symbol} "
 
-            if show_identical:
-                prefix = f"{indent}{status_symbol} " 
                 if source_node.is_dir:
-                    output.append(f"{prefix}{source_node.name}/ ({source_node.file_count:,} files) [identical]")
-                elif not only_show_dirs:
-                    output.append(f"{prefix}{source_node.name} [identical]")
-            return  # Don't recurse into identical directories
-
-        else:
-            # Modified (hashes differ)
-            diff_type = DiffType.MODIFIED
-            status_symbol = "✗"
-            prefix = f"{indent}{status_symbol} "
-
-            if source_node.is_dir:
-                self.stats.modified_dirs += 1
-                file_diff = target_node.file_count - source_node.file_count
-                file_diff_str = f"{file_diff:+,}" if file_diff != 0 else "same count"
-                output.append(
-                    f"{prefix}{source_node.name}/ "
-                    f"(source: {source_node.file_count:,} files, "
-                    f"target: {target_node.file_count:,} files, "
-                    f"diff: {file_diff_str}) [MODIFIED]"
-                )
-            else:
-                self.stats.modified_files += 1
-                if not only_show_dirs:
+                    self.stats.modified_dirs += 1
+                    file_diff = target_node.file_count - source_node.file_count
+                    file_diff_str = f"{file_diff:+,}" if file_diff != 0 else "same count"
                     output.append(
-                        f"{prefix}{source_node.name} "
-                        f"[MODIFIED - source: {source_node.file_hash[:8]}..., "
-                        f"target: {target_node.file_hash[:8]}...]"
+                        f"{prefix}{source_node.name}/ "
+                        f"(source: {source_node.file_count:,} files, "
+                        f"target: {target_node.file_count:,} files, "
+                        f"diff: {file_diff_str}) [MODIFIED]"
                     )
-
-        # Recurse into directories
-        if source_node and source_node.is_dir and diff_type == DiffType.MODIFIED:
-            # Get all child names from both nodes
-            all_children = set()
-            if source_node:
-                all_children.update(source_node.children.keys())
-            if target_node:
-                all_children.update(target_node.children.keys())
-
-            # Compare each child
-            for child_name in sorted(all_children):
-                child_path = f"{path}{child_name}/" if path == "/" else f"{path}/{child_name}/"
-
-                source_child = source_node.children.get(child_name) if source_node else None
-                target_child = target_node.children.get(child_name) if target_node else None
-
-                self._compare_nodes(
-                    path=child_path,
-                    source_node=source_child,
-                    target_node=target_child,
-                    output=output,
-                    depth=depth + 1,
-                    max_depth=max_depth,
-                    show_identical=show_identical,
-                    only_show_dirs=only_show_dirs
-                )
+                else:
+                    self.stats.modified_files += 1
+                    if not only_show_dirs:
+                        output.append(
+                            f"{prefix}{source_node.name} "
+                            f"[MODIFIED - source: {source_node.file_hash[:8]}..., "
+                            f"target: {target_node.file_hash[:8]}...]"
+                        )
+
+            # Descend into modified directories
+            if source_node and source_node.is_dir and diff_type == DiffType.MODIFIED:
+                # Get all child names from both nodes
+                all_children = set()
+                if source_node:
+                    all_children.update(source_node.children.keys())
+                if target_node:
+                    all_children.update(target_node.children.keys())
+
+                # Push children in reverse so they are popped in sorted order
+                for child_name in sorted(all_children, reverse=True):
+                    child_path = f"{path}{child_name}/" if path == "/" else f"{path}/{child_name}/"
+
+                    source_child = source_node.children.get(child_name) if source_node else None
+                    target_child = target_node.children.get(child_name) if target_node else None
+
+                    stack.append((child_path, source_child, target_child, depth + 1))
 
 
 def compare_trees(source_checksum: str, target_checksum: str,
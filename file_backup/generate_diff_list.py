@@ -77,24 +77,23 @@ def find_differences(source_checksums, target_checksums, mode='all'):
 
     if mode in ('all', 'missing', 'only-in-source'):
         # Files only in source (missing from target)
-        only_in_source = set(source_checksums.keys()) - set(target_checksums.keys())
+        only_in_source = source_checksums.keys() - target_checksums.keys()
         diff_files.extend(sorted(only_in_source))
         print(f"Files only in source: {len(only_in_source):,}", file=sys.stderr)
 
     if mode in ('all', 'modified'):
-        # Files with different hashes
-        modified = []
-        for filepath in source_checksums:
-            if filepath in target_checksums:
-                if source_checksums[filepath] != target_checksums[filepath]:
-                    modified.append(filepath)
+        # Files with different hashes (one lookup per file; a path missing
+        # from target defaults to its own hash and so is not "modified")
+        target_get = target_checksums.get
+        modified = [filepath for filepath, file_hash in source_checksums.items()
+                    if target_get(filepath, file_hash) != file_hash]
 
         diff_files.extend(sorted(modified))
         print(f"Modified files: {len(modified):,}", file=sys.stderr)
 
     if mode in ('all',):
         # Files only in target (extra files)
-        only_in_target = set(target_checksums.keys()) - set(source_checksums.keys())
+        only_in_target = target_checksums.keys() - source_checksums.keys()
         print(f"Files only in target: {len(only_in_target):,}", file=sys.stderr)
 
     return diff_files
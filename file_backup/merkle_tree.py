@@ -28,42 +28,52 @@ class MerkleNode:
 
     def compute_merkle_hash(self) -> str:
         """
-        Recursively compute the Merkle hash for this node.
+        Compute the Merkle hash for this node and everything below it.
         For files: use the original file hash
         For directories: hash the concatenation of sorted children's hashes
+        Children are resolved first using an explicit post-order stack,
+        so very deep trees cannot hit the recursion limit.
         """
-        if not self.is_dir:
-            # For files, the Merkle hash is just the file hash
-            self.merkle_hash = self.file_hash
-            self.file_count = 1
-            return self.merkle_hash
-
-        # For directories, compute hash from children
-        if not self.children:
-            # Empty directory
-            self.merkle_hash = hashlib.md5(b"empty_directory").hexdigest()
-            self.file_count = 0
-            return self.merkle_hash
-
-        # Recursively compute children hashes first
-        child_hashes = []
-        total_files = 0
-
-        for name in sorted(self.children.keys()):
-            child = self.children[name]
-            child_hash = child.compute_merkle_hash()
-            child_hashes.append(f"{name}:{child_hash}")
-            total_files += child.file_count
-
-        # Combine all child hashes
-        combined = "|".join(child_hashes)
-        self.merkle_hash = hashlib.md5(combined.encode('utf-8')).hexdigest()
-        self.file_count = total_files
+        stack = [(self, False)]
+
+        while stack:
+            node, children_done = stack.pop()
+
+            if not node.is_dir:
+                # For files, the Merkle hash is just the file hash
+                node.merkle_hash = node.file_hash
+                node.file_count = 1
+                continue
+
+            if not node.children:
+                # Empty directory
+                node.merkle_hash = hashlib.md5(b"empty_directory").hexdigest()
+                node.file_count = 0
+                continue
+
+            if not children_done:
+                # Revisit this directory once all children have hashes
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+                continue
+
+            child_hashes = []
+            total_files = 0
+
+            for name in sorted(node.children.keys()):
+                child = node.children[name]
+                child_hashes.append(f"{name}:{child.merkle_hash}")
+                total_files += child.file_count
+
+            # Combine all child hashes
+            combined = "|".join(child_hashes)
+            node.merkle_hash = hashlib.md5(combined.encode('utf-8')).hexdigest()
+            node.file_count = total_files
 
         return self.merkle_hash
 
-    def to_dict(self, include_children: bool = True) -> dict:
-        """Convert node to dictionary representation"""
+    def _node_dict(self) -> dict:
+        """Dictionary fields for this node alone (no children)"""
         result = {
             "name": self.name,
             "is_dir": self.is_dir,
@@ -74,14 +84,28 @@ class MerkleNode:
         if not self.is_dir:
             result["file_hash"] = self.file_hash
 
-        if self.is_dir and include_children and self.children:
-            result["children"] = {
-                name: child.to_dict(include_children)
-                for name, child in sorted(self.children.items())
-            }
-
         return result
 
+    def to_dict(self, include_children: bool = True) -> dict:
+        """Convert node to dictionary representation"""
+        root = self._node_dict()
+        if not include_children:
+            return root
+
+        # Iterative walk; each "children" dict is filled in sorted name order
+        stack = [(self, root)]
+        while stack:
+            node, result = stack.pop()
+            if not (node.is_dir and node.children):
+                continue
+
+            children = result["children"] = {}
+            for name, child in sorted(node.children.items()):
+                children[name] = child._node_dict()
+                stack.append((child, children[name]))
+
+        return root
+
 
 class MerkleTree:
     """Builds and manages a Merkle tree from checksum data"""
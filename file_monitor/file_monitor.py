@@ -7,39 +7,109 @@ Uses a fast binary format (msgpack) for state persistence.
 """
 
 import os
+import re
+import json
+import mmap
+import sys
+import struct
 import hashlib
 import argparse
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Set, Optional
+from typing import Callable, Dict, Set, Optional
 from datetime import datetime
+from stat import S_IFBLK, S_IFCHR
 
 try:
     import msgpack
 except ImportError:
     print("Warning: msgpack not installed. Install with: pip install msgpack")
     print("Falling back to slower JSON format.")
-    import json
     msgpack = None
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields that mark a file as modified between scans:
+# mtime (for regular files) or rdev (for device files)
+_COMPARE_FIELDS = ('mtime', 'rdev')
+
+# compare_states change lists in display order, with their symbols
+_CHANGE_SYMBOLS = (('added', '+'), ('removed', '-'), ('modified', '*'))
+
+# State file extensions, preferred format first. A state file with a later
+# extension was written before msgpack/zstandard was installed.
+_STATE_EXTENSIONS = ('.msgpack.zst', '.msgpack', '.json')
+
+
+def _legacy_state_files(state_file: Path) -> list:
+    """Older-format state files for the same target as state_file."""
+    name = state_file.name
+    for i, ext in enumerate(_STATE_EXTENSIONS):
+        if name.endswith(ext):
+            base = name[:-len(ext)]
+            return [state_file.with_name(base + old) for old in _STATE_EXTENSIONS[i + 1:]]
+    return []
+
+
+def _make_modified_finder(fields) -> Callable:
+    """
+    Generate a comparator loop with the schema fields inlined as constants,
+    so the per-file test is plain subscripts with no getter calls.
+    """
+    test = ' or '.join(f"c[{f!r}] != p[{f!r}]" for f in fields)
+    src = (
+        "def _find_modified(current, previous, common):\n"
+        "    modified = set()\n"
+        "    add = modified.add\n"
+        "    for path in common:\n"
+        "        c = current[path]\n"
+        "        p = previous[path]\n"
+        f"        if {test}:\n"
+        "            add(path)\n"
+        "    return modified\n"
+    )
+    namespace = {}
+    exec(src, namespace)
+    return namespace['_find_modified']
+
+
+_find_modified = _make_modified_finder(_COMPARE_FIELDS)
+
 
 class FileMonitor:
     """Simple file system monitor using file hashes."""
 
-    def __init__(self, root_path: str, exclude_patterns: list = None):
+    def __init__(self, root_path: str, exclude_patterns: list = None, stat_threads: int = 8):
         self.root_path = Path(root_path).resolve()
         self.exclude_patterns = exclude_patterns or ['.git', '__pycache__', '.cache', 'node_modules']
+        self.stat_threads = stat_threads
+        # One alternation regex: a single scan per path instead of one per pattern
+        self._exclude_re = re.compile('|'.join(map(re.escape, self.exclude_patterns)))
         self.files: Dict[str, dict] = {}
+        self.device_files: Set[str] = set()
+        self._state_file_path: Optional[Path] = None
 
     def get_state_file_path(self) -> Path:
         """Get path to state file in ~/.config/file_monitor/"""
+        if self._state_file_path is not None:
+            return self._state_file_path
+
         config_dir = Path.home() / '.config' / 'file_monitor'
         config_dir.mkdir(parents=True, exist_ok=True)
 
         # Create unique filename based on target path
         path_str = str(self.root_path)
-        if self.exclude_patterns:
-            hash_str = path_str + ''.join(sorted(self.exclude_patterns))
+        hash_str = path_str + ''.join(sorted(self.exclude_patterns))
         path_hash = hashlib.sha256(hash_str.encode('utf-8')).hexdigest()[:16]
 
         # Readable filename
@@ -47,73 +117,104 @@ class FileMonitor:
         if len(safe_path) > 50:
             safe_path = safe_path[:50]
 
-        ext = '.msgpack' if msgpack else '.json'
+        if msgpack:
+            ext = '.msgpack.zst' if zstandard else '.msgpack'
+        else:
+            ext = '.json'
         filename = f"{path_hash}_{safe_path}{ext}"
-        return config_dir / filename
+        self._state_file_path = config_dir / filename
+        return self._state_file_path
 
     def _should_exclude(self, path: Path) -> bool:
         """Check if path should be excluded."""
-        path_str = str(path)
-        for pattern in self.exclude_patterns:
-            if pattern in path_str:
-                return True
-        return False
+        return self._exclude_re.search(str(path)) is not None
 
     def collect_files(self) -> Dict[str, dict]:
         """
         Scan filesystem and collect file metadata.
         Returns dict of {relative_path: {mtime, mode, rdev}}
+        Block/char device paths are also recorded in self.device_files.
+
+        The walk is an explicit scandir() DFS that only lists directories and
+        builds plain path strings; the per-file lstat() calls are then spread
+        over a thread pool (the GIL is released during the syscall), which
+        hides latency on HDD and network filesystems.
         """
         files = {}
-
-        try:
-            for root, dirs, filenames in os.walk(self.root_path, followlinks=False):
-                root_path = Path(root)
-
-                # Filter out excluded directories
-                dirs[:] = [d for d in dirs if not self._should_exclude(root_path / d)]
-
-                for filename in filenames:
-                    file_path = root_path / filename
-
-                    if self._should_exclude(file_path):
+        device_files = set()
+        rel_paths = []
+        full_paths = []
+
+        root_str = str(self.root_path)
+        # Relative path = full path minus this prefix (no Path.relative_to)
+        prefix_len = len(os.path.join(root_str, ''))
+        should_exclude = self._exclude_re.search
+        stack = [root_str]
+
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                # Unreadable directory: skip it, like os.walk does
+                continue
+
+            with entries:
+                for entry in entries:
+                    path = entry.path
+                    if should_exclude(path):
                         continue
 
                     try:
-                        stat_info = file_path.lstat()
-                        rel_path = str(file_path.relative_to(self.root_path))
-
-                        files[rel_path] = {
-                            'mtime': stat_info.st_mtime,
-                            'mode': stat_info.st_mode,
-                            'rdev': stat_info.st_rdev
-                        }
-                    except (PermissionError, FileNotFoundError, OSError):
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+
+                    if is_dir:
+                        # Symlinks to directories are neither followed nor recorded
+                        if not entry.is_symlink():
+                            stack.append(path)
                         continue
 
-        except PermissionError:
-            print(f"Permission denied accessing {self.root_path}")
+                    rel_paths.append(path[prefix_len:])
+                    full_paths.append(path)
+
+        if self.stat_threads > 1:
+            with ThreadPoolExecutor(max_workers=self.stat_threads) as executor:
+                stats = list(executor.map(_lstat_or_none, full_paths, chunksize=64))
+        else:
+            stats = map(_lstat_or_none, full_paths)
+
+        for rel_path, stat_info in zip(rel_paths, stats):
+            if stat_info is None:
+                continue
 
+            files[rel_path] = {
+                'mtime': stat_info.st_mtime,
+                'mode': stat_info.st_mode,
+                'rdev': stat_info.st_rdev
+            }
+            if (stat_info.st_mode & 0o170000) in (S_IFBLK, S_IFCHR):
+                device_files.add(rel_path)
+
+        self.device_files = device_files
         return files
 
     def calculate_summary_hash(self) -> str:
         """Calculate a single hash representing all file states."""
-        # Sort items for deterministic hash
-        sorted_items = sorted(self.files.items())
+        # Sort paths only (no (path, info) tuple list) for deterministic hash
+        files = self.files
+        devices = self.device_files
+        if devices:
+            # Device files are rare; keep them out of the common loop
+            regular_paths = sorted(files.keys() - devices)
+            device_paths = sorted(devices & files.keys())
+        else:
+            regular_paths = sorted(files)
+            device_paths = []
 
-        # Create hash from all file data
+        # Build the whole fingerprint first, then hash it in one call
         hasher = hashlib.sha256()
-        for path, info in sorted_items:
-            # For device files, use rdev; for regular files, use mtime
-            import stat
-            if stat.S_ISBLK(info['mode']) or stat.S_ISCHR(info['mode']):
-                major = os.major(info['rdev'])
-                minor = os.minor(info['rdev'])
-                data = f"{path}:dev:{major}:{minor}"
-            else:
-                data = f"{path}:{info['mtime']}"
-
-            hasher.update(data.encode('utf-8'))
+        hasher.update(_build_fingerprint(files, regular_paths, device_paths))
 
         return hasher.hexdigest()
 
@@ -127,24 +228,57 @@ class FileMonitor:
             'files': self.files
         }
 
-        if msgpack:
+        if msgpack and zstandard and state_file.name.endswith('.msgpack.zst'):
+            # msgpack compressed with zstd level 1 (smaller reads on cold cache)
+            data = msgpack.packb(state, use_bin_type=True)
+            with open(state_file, 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=1).compress(data))
+        elif msgpack:
             # Use msgpack for fast binary serialization
             with open(state_file, 'wb') as f:
                 msgpack.pack(state, f, use_bin_type=True)
         else:
-            # Fallback to JSON
+            # Fallback to JSON, compact separators (no padding per entry)
             with open(state_file, 'w') as f:
-                json.dump(state, f)
+                json.dump(state, f, separators=(',', ':'))
+
+        # The baseline now lives in state_file; drop older-format copies
+        for legacy_file in _legacy_state_files(state_file):
+            try:
+                legacy_file.unlink()
+            except FileNotFoundError:
+                pass
 
     def load_state(self, state_file: Path) -> Optional[dict]:
         """Load previous state from file."""
         if not state_file.exists():
-            return None
+            # Fall back to a state file from before msgpack/zstandard was
+            # installed (save_state removes it once the new one is written)
+            state_file = next((f for f in _legacy_state_files(state_file) if f.exists()), None)
+            if state_file is None:
+                return None
 
         try:
-            if msgpack and state_file.suffix == '.msgpack':
-                with open(state_file, 'rb') as f:
-                    return msgpack.unpack(f, raw=False)
+            if msgpack and zstandard and state_file.name.endswith('.msgpack.zst'):
+                with open(state_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = zstandard.ZstdDecompressor().decompress(mm)
+                return msgpack.unpackb(data, raw=False)
+            elif msgpack and state_file.suffix == '.msgpack':
+                # Parse straight from the page cache, no intermediate read() copy
+                with open(state_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return msgpack.unpackb(mm, raw=False)
+            elif orjson:
+                with open(state_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                        memoryview(mm) as view:
+                    try:
+                        return orjson.loads(view)
+                    except orjson.JSONDecodeError:
+                        # Non-UTF-8 filenames (surrogateescape'd by scandir) are
+                        # saved as lone "\udcXX" escapes, which orjson rejects
+                        return json.loads(bytes(view))
             else:
                 with open(state_file, 'r') as f:
                     return json.load(f)
@@ -156,49 +290,84 @@ class FileMonitor:
         """
         Compare current state with previous state.
         Returns dict with added, removed, modified files.
+        Lists are unsorted; format_grouped_changes orders them for display.
         """
         current_files = set(self.files.keys())
         previous_files = set(previous_state['files'].keys())
 
         added = current_files - previous_files
         removed = previous_files - current_files
-        modified = set()
 
         # Check for modifications in files that exist in both states
-        for file_path in current_files & previous_files:
-            current_info = self.files[file_path]
-            previous_info = previous_state['files'][file_path]
-
-            # Compare mtime (for regular files) or rdev (for device files)
-            if current_info['mtime'] != previous_info['mtime'] or \
-               current_info['rdev'] != previous_info['rdev']:
-                modified.add(file_path)
+        modified = _find_modified(self.files, previous_state['files'],
+                                  current_files & previous_files)
 
         return {
-            'added': sorted(list(added)),
-            'removed': sorted(list(removed)),
-            'modified': sorted(list(modified)),
+            'added': list(added),
+            'removed': list(removed),
+            'modified': list(modified),
             'total_changes': len(added) + len(removed) + len(modified)
         }
 
 
+def _lstat_or_none(path: str) -> Optional[os.stat_result]:
+    """lstat() a path, returning None if it vanished or is unreadable."""
+    try:
+        return os.lstat(path)
+    except (PermissionError, FileNotFoundError, OSError):
+        return None
+
+
+def _build_fingerprint(files: Dict[str, dict], regular_paths, device_paths=()) -> bytes:
+    """
+    Assemble the summary hash input for the given (sorted) paths.
+
+    Layout: a header with both counts, the NUL-separated regular paths,
+    their mtimes as packed little-endian doubles, then the NUL-separated
+    device paths and their (major, minor) pairs as packed uint32s.
+    Paths are encoded in one call and numbers are packed in bulk, so there
+    is no per-file string formatting, and the hash no longer depends on
+    how floats are rendered as text.
+    """
+    mtimes = array('d', [files[path]['mtime'] for path in regular_paths])
+
+    devices = array('I')
+    for path in device_paths:
+        rdev = files[path]['rdev']
+        devices.extend((os.major(rdev), os.minor(rdev)))
+
+    if sys.byteorder != 'little':
+        mtimes.byteswap()
+        devices.byteswap()
+
+    return b''.join((
+        struct.pack('<QQ', len(regular_paths), len(device_paths)),
+        '\0'.join(regular_paths).encode('utf-8', 'surrogateescape'),
+        b'\0',
+        mtimes.tobytes(),
+        '\0'.join(device_paths).encode('utf-8', 'surrogateescape'),
+        b'\0',
+        devices.tobytes(),
+    ))
+
+
 def group_by_directory(files: list, max_depth: int = 3) -> dict:
     """Group files by their common directory prefix."""
     from collections import defaultdict
     groups = defaultdict(list)
+    sep = os.sep
 
     for file in files:
-        parts = Path(file).parts
+        # Plain string splitting, no Path objects per file
+        parts = file.split(sep)
 
         if len(parts) <= max_depth:
             if len(parts) == 1:
                 groups[file].append(file)
             else:
-                parent = str(Path(*parts[:-1])) if len(parts) > 1 else parts[0]
-                groups[parent].append(file)
+                groups[sep.join(parts[:-1])].append(file)
         else:
-            prefix = str(Path(*parts[:max_depth]))
-            groups[prefix].append(file)
+            groups[sep.join(parts[:max_depth])].append(file)
 
     return dict(groups)
 
@@ -209,6 +378,48 @@ def format_grouped_changes(files: list, change_symbol: str, max_display: int = 2
         return []
 
     groups = group_by_directory(files, max_depth=3)
+    return _format_groups(groups, len(files), change_symbol, max_display, expand_all)
+
+
+def format_grouped_changes_all(changes: dict, max_display: int = 20, expand_all: bool = False) -> dict:
+    """
+    Format the added/removed/modified lists from compare_states in one go.
+
+    All changed paths are sorted once and split into directory groups in a
+    single pass, so each group's files arrive already in order (no sort per
+    group per change type). Returns {change_type: lines}, the same lines
+    format_grouped_changes gives for each list.
+    """
+    sep = os.sep
+    max_depth = 3
+    groups = {change_type: {} for change_type, _ in _CHANGE_SYMBOLS}
+
+    tagged = [(file, change_type) for change_type, _ in _CHANGE_SYMBOLS
+              for file in changes[change_type]]
+    tagged.sort()
+
+    for file, change_type in tagged:
+        parts = file.split(sep)
+        if len(parts) <= max_depth:
+            directory = file if len(parts) == 1 else sep.join(parts[:-1])
+        else:
+            directory = sep.join(parts[:max_depth])
+        kind_groups = groups[change_type]
+        if directory in kind_groups:
+            kind_groups[directory].append(file)
+        else:
+            kind_groups[directory] = [file]
+
+    return {
+        change_type: _format_groups(groups[change_type], len(changes[change_type]),
+                                    symbol, max_display, expand_all, presorted=True)
+        for change_type, symbol in _CHANGE_SYMBOLS
+    }
+
+
+def _format_groups(groups: dict, total_files: int, change_symbol: str, max_display: int,
+                   expand_all: bool, presorted: bool = False) -> list:
+    """Format {directory: files} groups into display lines, up to max_display."""
     output = []
     total_shown = 0
 
@@ -220,7 +431,7 @@ def format_grouped_changes(files: list, change_symbol: str, max_display: int = 2
             total_shown += 1
         elif expand_all or len(dir_files) <= 3:
             output.append(f"    {change_symbol} {directory}/ ({len(dir_files)} files):")
-            for f in sorted(dir_files):
+            for f in (dir_files if presorted else sorted(dir_files)):
                 relative_path = f
                 if f.startswith(directory + '/'):
                     relative_path = f[len(directory) + 1:]
@@ -231,7 +442,7 @@ def format_grouped_changes(files: list, change_symbol: str, max_display: int = 2
             total_shown += len(dir_files)
 
         if len(output) >= max_display:
-            remaining = len(files) - total_shown
+            remaining = total_files - total_shown
             if remaining > 0:
                 output.append(f"    ... and {remaining} more files")
             break
@@ -239,7 +450,7 @@ def format_grouped_changes(files: list, change_symbol: str, max_display: int = 2
     return output
 
 
-def run_timing_benchmark(root_path: Path, exclude_patterns: list):
+def run_timing_benchmark(root_path: Path, exclude_patterns: list, stat_threads: int = 8):
     """Run timing benchmark comparing old and new format."""
     print("\n" + "="*60)
     print("TIMING BENCHMARK")
@@ -252,7 +463,7 @@ def run_timing_benchmark(root_path: Path, exclude_patterns: list):
         run_key = f'run{run_num}'
         print(f"--- Run {run_num} {'(Cold cache)' if run_num == 1 else '(Warm cache)'} ---")
 
-        monitor = FileMonitor(root_path, exclude_patterns)
+        monitor = FileMonitor(root_path, exclude_patterns, stat_threads)
         state_file = monitor.get_state_file_path()
 
         # File collection
@@ -351,6 +562,12 @@ def main():
         action='store_true',
         help='Run timing benchmark'
     )
+    parser.add_argument(
+        '--stat-threads',
+        type=int,
+        default=8,
+        help='Threads used for lstat() calls during the scan (default: 8, 1 = serial)'
+    )
 
     args = parser.parse_args()
 
@@ -372,14 +589,14 @@ def main():
 
     # Timing benchmark
     if args.timing:
-        run_timing_benchmark(target_path, exclude_patterns)
+        run_timing_benchmark(target_path, exclude_patterns, args.stat_threads)
         return 0
 
     # Normal operation
     print(f"Scanning: {target_path}")
     print(f"Excluding: {', '.join(exclude_patterns)}\n")
 
-    monitor = FileMonitor(target_path, exclude_patterns)
+    monitor = FileMonitor(target_path, exclude_patterns, args.stat_threads)
     state_file = monitor.get_state_file_path()
 
     # Collect current state
@@ -422,28 +639,31 @@ def main():
             # Detailed comparison
             changes = monitor.compare_states(previous_state)
 
-            print(f"\nTotal changes: {changes['total_changes']}")
+            # Build the whole report, then write it in one call rather than
+            # one print() per line (verbose runs can list thousands of files)
+            lines = [f"\nTotal changes: {changes['total_changes']}"]
 
             if not args.verbose and changes['total_changes'] > 0:
-                print("(Limited to 20 directory groups. Use -v/--verbose to see all)\n")
+                lines.append("(Limited to 20 directory groups. Use -v/--verbose to see all)\n")
 
             max_display = 999999 if args.verbose else 20
             expand_all = args.verbose
 
+            grouped = format_grouped_changes_all(changes, max_display, expand_all)
+
             if changes['added']:
-                print(f"\n[+] Added files ({len(changes['added'])}):")
-                for line in format_grouped_changes(changes['added'], '+', max_display, expand_all):
-                    print(line)
+                lines.append(f"\n[+] Added files ({len(changes['added'])}):")
+                lines.extend(grouped['added'])
 
             if changes['removed']:
-                print(f"\n[-] Removed files ({len(changes['removed'])}):")
-                for line in format_grouped_changes(changes['removed'], '-', max_display, expand_all):
-                    print(line)
+                lines.append(f"\n[-] Removed files ({len(changes['removed'])}):")
+                lines.extend(grouped['removed'])
 
             if changes['modified']:
-                print(f"\n[*] Modified files ({len(changes['modified'])}):")
-                for line in format_grouped_changes(changes['modified'], '*', max_display, expand_all):
-                    print(line)
+                lines.append(f"\n[*] Modified files ({len(changes['modified'])}):")
+                lines.extend(grouped['modified'])
+
+            sys.stdout.write('\n'.join(lines) + '\n')
 
     # Save current state
     monitor.save_state(state_file)
@@ -0,0 +1,7 @@
+"""Fixtures for file_monitor.py unit tests."""
+
+import os
+import sys
+
+# Add file_monitor directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
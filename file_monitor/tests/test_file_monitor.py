@@ -0,0 +1,58 @@
+"""Unit tests for file_monitor.py state persistence."""
+
+import json
+
+import pytest
+
+import file_monitor
+
+
+def make_monitor(tmp_path, files):
+    monitor = file_monitor.FileMonitor(str(tmp_path))
+    monitor.files = files
+    return monitor
+
+
+class TestLegacyStateFiles:
+    def test_older_formats_listed(self, tmp_path):
+        state_file = tmp_path / "abc_home.v2_x.msgpack.zst"
+        assert file_monitor._legacy_state_files(state_file) == [
+            tmp_path / "abc_home.v2_x.msgpack",
+            tmp_path / "abc_home.v2_x.json",
+        ]
+        assert file_monitor._legacy_state_files(tmp_path / "abc.json") == []
+
+    def test_load_falls_back_to_json_state(self, tmp_path):
+        files = {"a.txt": {"mtime": 1.0, "mode": 0o100644, "rdev": 0}}
+        legacy = tmp_path / "abc.json"
+        legacy.write_text(json.dumps({"root_path": str(tmp_path), "files": files}))
+
+        monitor = make_monitor(tmp_path, files)
+        state = monitor.load_state(tmp_path / "abc.msgpack")
+        assert state["files"] == files
+
+    def test_save_removes_legacy_state(self, tmp_path):
+        pytest.importorskip("msgpack")
+        files = {"a.txt": {"mtime": 1.0, "mode": 0o100644, "rdev": 0}}
+        legacy = tmp_path / "abc.json"
+        legacy.write_text(json.dumps({"root_path": str(tmp_path), "files": files}))
+
+        monitor = make_monitor(tmp_path, files)
+        state_file = tmp_path / "abc.msgpack"
+        monitor.save_state(state_file)
+        assert not legacy.exists()
+        assert monitor.load_state(state_file)["files"] == files
+
+
+class TestStateRoundTrip:
+    def test_non_utf8_filename(self, tmp_path):
+        # A filename with an invalid UTF-8 byte, as returned by os.scandir
+        name = b"bad\xff.txt".decode("utf-8", "surrogateescape")
+        files = {name: {"mtime": 1.0, "mode": 0o100644, "rdev": 0}}
+        monitor = make_monitor(tmp_path, files)
+        state_file = tmp_path / "abc.json"
+        monitor.save_state(state_file)
+
+        state = monitor.load_state(state_file)
+        assert state is not None
+        assert state["files"] == files
@@ -7,13 +7,12 @@ def benchmark(iterations: int, grid_size: int) -> float:
     """Run benchmark for specified iterations and grid size"""
     grid = Grid.random_grid(grid_size, grid_size, 42)
 
-    start_time = time.perf_counter()
+    start_time = time.perf_counter_ns()
 
-    for _ in range(iterations):
-        grid = grid.evolve()
+    grid.evolve_n(iterations)
 
-    end_time = time.perf_counter()
-    elapsed = end_time - start_time
+    end_time = time.perf_counter_ns()
+    elapsed = (end_time - start_time) / 1e9
 
     return elapsed
 
@@ -28,8 +27,8 @@ def main():
     print(f"Iterations: {iterations}")
     print()
 
-    # Warmup
-    _ = benchmark(10, grid_size)
+    # Warmup (same grid shape as the measured run)
+    Grid.warmup(grid_size, grid_size)
 
     # Actual benchmark
     elapsed = benchmark(iterations, grid_size)
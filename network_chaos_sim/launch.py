@@ -14,14 +14,26 @@ import re
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import yaml
 except ImportError:
     yaml = None
 
+try:
+    import docker
+except ImportError:
+    docker = None
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+MESH_NETWORK = "manet_mesh"
+MESH_SUBNET = "172.31.0.0/24"
+METRICS_VOLUME = "manet_metrics"
+
+_docker_client = None
+
 
 def read_config():
     """Read config.yaml and return the parsed dict.
@@ -56,6 +68,91 @@ def run(cmd, check=True):
     return result.returncode == 0
 
 
+def get_docker_client():
+    """Return a shared Docker SDK client, or None to use the docker CLI.
+
+    Uses the docker package if available and the daemon is reachable, so
+    network/volume setup goes over one API connection instead of spawning
+    a shell and a docker CLI process per command.
+    """
+    global _docker_client
+    if _docker_client is None and docker is not None:
+        try:
+            _docker_client = docker.from_env()
+        except docker.errors.DockerException:
+            _docker_client = False
+    return _docker_client or None
+
+
+def create_network():
+    """Create the shared MANET mesh network (no-op if it exists)."""
+    client = get_docker_client()
+    if client is None:
+        run(f"docker network create --subnet={MESH_SUBNET} {MESH_NETWORK} 2>/dev/null || true", check=False)
+        return
+    print(f"  docker network create --subnet={MESH_SUBNET} {MESH_NETWORK}")
+    ipam = docker.types.IPAMConfig(pool_configs=[docker.types.IPAMPool(subnet=MESH_SUBNET)])
+    try:
+        client.networks.create(MESH_NETWORK, driver="bridge", ipam=ipam)
+    except docker.errors.APIError:
+        pass  # already exists
+
+
+def create_volume():
+    """Create the shared metrics volume (no-op if it exists)."""
+    client = get_docker_client()
+    if client is None:
+        run(f"docker volume create {METRICS_VOLUME} 2>/dev/null || true", check=False)
+        return
+    print(f"  docker volume create {METRICS_VOLUME}")
+    try:
+        client.volumes.create(METRICS_VOLUME)
+    except docker.errors.APIError:
+        pass
+
+
+def remove_network():
+    """Remove the shared MANET mesh network (no-op if it is gone)."""
+    client = get_docker_client()
+    if client is None:
+        run(f"docker network rm {MESH_NETWORK} 2>/dev/null || true", check=False)
+        return
+    print(f"  docker network rm {MESH_NETWORK}")
+    try:
+        client.networks.get(MESH_NETWORK).remove()
+    except docker.errors.APIError:
+        pass  # not found or still in use
+
+
+def run_parallel(func, items):
+    """Call func(item) for every item on a thread pool.
+
+    Each call mostly waits on a docker compose subprocess, so they overlap
+    well. Waits for all calls and re-raises the first failure (including
+    the SystemExit from a failed run()).
+    """
+    items = list(items)
+    if not items:
+        return
+    max_workers = min(len(items), (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(func, items))
+
+
+def launch_drone(i, drone_count):
+    """Launch drone i's radio and app containers."""
+    print(f"\n--- Drone {i} ---")
+    env = f"DRONE_ID={i} DRONE_COUNT={drone_count}"
+    compose_files = "-f drone/compose.radio.yml -f drone/compose.app.yml"
+    run(f"{env} docker compose {compose_files} -p drone{i} up -d --build")
+
+
+def stop_project(project):
+    """Stop one compose project."""
+    print(f"Stopping {project}...")
+    run(f"docker compose -p {project} down", check=False)
+
+
 def launch(drone_count, with_base_station=False):
     """Launch the MANET simulator with N drones."""
     print(f"\n=== Launching MANET Chaos Simulator ===")
@@ -65,11 +162,11 @@ def launch(drone_count, with_base_station=False):
 
     # Create shared MANET mesh network
     print("Creating shared networks...")
-    run("docker network create --subnet=172.31.0.0/24 manet_mesh 2>/dev/null || true", check=False)
+    create_network()
 
     # Create shared metrics volume
     print("Creating shared volumes...")
-    run("docker volume create manet_metrics 2>/dev/null || true", check=False)
+    create_volume()
 
     # Launch control plane (UI)
     print("\nStarting control plane...")
@@ -80,13 +177,9 @@ def launch(drone_count, with_base_station=False):
         print("\n--- Base Station ---")
         run(f"DRONE_COUNT={drone_count} docker compose -f base_station/compose.yml -p base_station up -d --build")
 
-    # Launch each drone
+    # Launch all drones concurrently
     print(f"\nStarting {drone_count} drones...")
-    for i in range(1, drone_count + 1):
-        print(f"\n--- Drone {i} ---")
-        env = f"DRONE_ID={i} DRONE_COUNT={drone_count}"
-        compose_files = "-f drone/compose.radio.yml -f drone/compose.app.yml"
-        run(f"{env} docker compose {compose_files} -p drone{i} up -d --build")
+    run_parallel(lambda i: launch_drone(i, drone_count), range(1, drone_count + 1))
 
     print(f"\n{'='*50}")
     print(f"  MANET Simulator Ready")
@@ -118,10 +211,10 @@ def stop():
     )
     projects = result.stdout.strip().split("\n")
 
-    for project in projects:
-        if project.startswith("drone") or project == "base_station":
-            print(f"Stopping {project}...")
-            run(f"docker compose -p {project} down", check=False)
+    run_parallel(stop_project, [
+        project for project in projects
+        if project.startswith("drone") or project == "base_station"
+    ])
 
     # Stop control plane
     print("Stopping control plane...")
@@ -129,7 +222,7 @@ def stop():
 
     # Remove shared resources
     print("Removing shared network...")
-    run("docker network rm manet_mesh 2>/dev/null || true", check=False)
+    remove_network()
 
     print("\n=== Stopped ===")
 
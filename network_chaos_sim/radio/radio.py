@@ -9,18 +9,31 @@ Features:
 - Star and mesh topology support
 """
 
+import asyncio
+import atexit
+import errno
+import gzip
+import itertools
 import json
 import math
 import os
+import re
 import socket
 import subprocess
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
 
 import yaml
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configuration
 DRONE_ID = int(os.environ.get("DRONE_ID", 1))
 DRONE_COUNT = int(os.environ.get("DRONE_COUNT", 3))
@@ -28,6 +41,21 @@ METRICS_DIR = Path("/metrics")
 CONFIG_DIR = Path("/config")
 PROBE_INTERVAL = 1
 
+def dumps_json(obj):
+    """Serialize obj to JSON bytes (orjson when installed, else stdlib json).
+
+    Non-string keys such as drone ids are converted to strings either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode()
+
+def loads_json(data):
+    """Parse JSON bytes (orjson when installed, else stdlib json)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # Load configuration
 def load_config():
     config_file = CONFIG_DIR / "config.yaml"
@@ -78,25 +106,39 @@ class State:
         "tx_packets_sec": 0, "rx_packets_sec": 0,
         "load_percent": 0.0,
     }
-    link_traffic = {}  # drone_id -> {tx_bytes, tx_packets, tx_bytes_sec, tx_packets_sec, dropped}
+    link_traffic = {}  # drone_id -> {tx_bytes, tx_packets, tx_bytes_sec, tx_packets_sec, dropped, epoch}
     tc_class_map = {}  # class_id -> target_id (set during apply_link_rules)
+    # target_id -> counter epoch, bumped by apply_link_rules whenever the
+    # link's netem qdisc is recreated (which restarts its tc counters)
+    link_epochs = {}
+    probe_backoff = {}  # target_id -> (next probe time, consecutive failed probes)
+    applied_links = {}  # target_id -> (class_id, ceil_kbit, netem args) currently in tc
 
 state = State()
 
 # Initialize positions from config
+def normalize_position(data):
+    """Position dict with float x, y, z (missing ones default to 0).
+
+    Positions are normalized wherever they are stored, so readers can
+    index them directly. Coordinates that are not numbers raise
+    ValueError or TypeError.
+    """
+    return {"x": float(data.get("x", 0)), "y": float(data.get("y", 0)), "z": float(data.get("z", 0))}
+
 def init_positions():
     defaults = CONFIG.get("defaults", {}).get("positions", {})
     for drone_id in range(1, DRONE_COUNT + 1):
         if str(drone_id) in defaults:
-            state.positions[drone_id] = defaults[str(drone_id)]
+            state.positions[drone_id] = normalize_position(defaults[str(drone_id)])
         elif drone_id in defaults:
-            state.positions[drone_id] = defaults[drone_id]
+            state.positions[drone_id] = normalize_position(defaults[drone_id])
         else:
             state.positions[drone_id] = {"x": 0, "y": 0, "z": 0}
 
     # Base station at position 0
     base_pos = CONFIG.get("radio", {}).get("base_station", {}).get("position", {"x": 0, "y": 0, "z": 0})
-    state.positions[0] = base_pos
+    state.positions[0] = normalize_position(base_pos)
 
     state.environment = CONFIG.get("defaults", {}).get("environment", "clear")
     state.topology = CONFIG.get("topology", {}).get("default", "mesh")
@@ -104,84 +146,90 @@ def init_positions():
 init_positions()
 
 # Traffic statistics collection
-def setup_iptables_accounting():
-    """Set up iptables rules to count traffic per destination."""
-    # Clear existing accounting rules
-    run_cmd("iptables -F OUTPUT 2>/dev/null")
-    run_cmd("iptables -F INPUT 2>/dev/null")
-
-    # Add rules for each potential target
-    for target_id in range(0, DRONE_COUNT + 1):
-        if target_id == DRONE_ID:
-            continue
-        target_ip = get_drone_ip(target_id)
-        # Count outgoing traffic to each peer
-        run_cmd(f"iptables -A OUTPUT -d {target_ip} -j ACCEPT")
-        # Count incoming traffic from each peer
-        run_cmd(f"iptables -A INPUT -s {target_ip} -j ACCEPT")
-
-    print(f"iptables accounting rules configured for {DRONE_COUNT} peers")
+_net_dev_fd = None  # /proc/net/dev, kept open between stats reads; -1 if absent
+_net_dev_key = (None, b"")  # (interface, b"<interface>:") last searched for
+
+@atexit.register
+def close_net_dev():
+    """Close the kept-open /proc/net/dev descriptor."""
+    global _net_dev_fd
+    if _net_dev_fd is not None and _net_dev_fd >= 0:
+        try:
+            os.close(_net_dev_fd)
+        except OSError:
+            pass
+    _net_dev_fd = None
 
 def read_interface_stats():
-    """Read total interface traffic from /proc/net/dev."""
+    """Read total interface traffic from /proc/net/dev.
+
+    The file is kept open and re-read from offset 0 with one pread per
+    call; the interface's line is found with a bytes search for a prefix
+    encoded once, rather than decoding and scanning every line.
+    """
+    global _net_dev_fd, _net_dev_key
     iface = MANET_INTERFACE or "eth0"
+    cached_iface, key = _net_dev_key
+    if cached_iface != iface:
+        key = f"{iface}:".encode()
+        _net_dev_key = (iface, key)
     try:
-        with open("/proc/net/dev") as f:
-            for line in f:
-                if f"{iface}:" in line:
-                    parts = line.split()
-                    # Format: iface rx_bytes rx_packets ... tx_bytes tx_packets ...
-                    return {
-                        "rx_bytes": int(parts[1]),
-                        "rx_packets": int(parts[2]),
-                        "tx_bytes": int(parts[9]),
-                        "tx_packets": int(parts[10]),
-                    }
-    except (IOError, IndexError, ValueError):
+        if _net_dev_fd is None:
+            _net_dev_fd = os.open("/proc/net/dev", os.O_RDONLY)
+        elif _net_dev_fd < 0:
+            return {"rx_bytes": 0, "rx_packets": 0, "tx_bytes": 0, "tx_packets": 0}
+        buf = os.pread(_net_dev_fd, 65536, 0)
+
+        # Match the name only at the start of a (space-padded) line
+        i = buf.find(key)
+        while i > 0 and buf[i - 1] not in b" \n":
+            i = buf.find(key, i + 1)
+        if i >= 0:
+            start = i + len(key)
+            end = buf.find(b"\n", start)
+            parts = buf[start:end if end >= 0 else len(buf)].split()
+            # Format: rx_bytes rx_packets ... (8 rx fields) tx_bytes tx_packets ...
+            return {
+                "rx_bytes": int(parts[0]),
+                "rx_packets": int(parts[1]),
+                "tx_bytes": int(parts[8]),
+                "tx_packets": int(parts[9]),
+            }
+    except OSError as e:
+        close_net_dev()
+        if e.errno == errno.ENOENT:
+            # No procfs (not running on Linux): don't retry every cycle
+            _net_dev_fd = -1
+        # Otherwise reopen on the next call
+    except (IndexError, ValueError):
         pass
     return {"rx_bytes": 0, "rx_packets": 0, "tx_bytes": 0, "tx_packets": 0}
 
+# A netem qdisc line and the stats line after it in "tc -s qdisc show":
+#   qdisc netem 11: parent 1:11 limit 1000 delay 5ms  1ms loss 1%
+#    Sent 169486 bytes 2422 pkt (dropped 22, overlimits 0 requeues 0)
+# The netem qdisc's parent is the HTB class ID it's attached to
+_NETEM_STATS_RE = re.compile(
+    r"^qdisc netem \S+ parent \d+:(\d+)\b.*\n\s*Sent (\d+) bytes (\d+) pkt \(dropped (\d+)",
+    re.MULTILINE)
+
 def read_tc_class_stats():
     """Read per-class traffic stats from tc (shows actual delivered traffic after netem)."""
     counters = {}
 
     try:
-        # Read qdisc stats - netem qdiscs are children of HTB classes
-        # The netem handle matches the class ID it's attached to
-        ok, qdisc_output = run_cmd(f"tc -s qdisc show dev {MANET_INTERFACE}")
+        ok, qdisc_output = run_cmd(["tc", "-s", "qdisc", "show", "dev", MANET_INTERFACE])
         if ok:
-            current_class_id = None
-            for line in qdisc_output.split("\n"):
-                if line.startswith("qdisc netem"):
-                    # Extract parent class: "qdisc netem 11: parent 1:11 ..."
-                    try:
-                        parts = line.split()
-                        # parent is like "1:11" - extract the class ID
-                        parent = parts[4]  # "1:11"
-                        current_class_id = int(parent.split(":")[1])
-                    except (ValueError, IndexError):
-                        current_class_id = None
-                elif current_class_id and "Sent" in line:
-                    # Parse: " Sent 169486 bytes 2422 pkt (dropped 22, overlimits 0 requeues 0)"
-                    try:
-                        parts = line.split()
-                        bytes_sent = int(parts[1])
-                        pkts_sent = int(parts[3])
-                        dropped = 0
-                        if "dropped" in line:
-                            dropped = int(line.split("dropped")[1].split(",")[0].strip())
-
-                        # Map class ID to target drone ID
-                        if current_class_id in state.tc_class_map:
-                            target_id = state.tc_class_map[current_class_id]
-                            counters[target_id] = {
-                                "tx_bytes": bytes_sent,
-                                "tx_packets": pkts_sent,
-                                "dropped": dropped,
-                            }
-                    except (ValueError, IndexError):
-                        pass
-                    current_class_id = None
+            class_map = state.tc_class_map
+            # One pass over the output; map class ID to target drone ID
+            for match in _NETEM_STATS_RE.finditer(qdisc_output):
+                target_id = class_map.get(int(match[1]))
+                if target_id is not None:
+                    counters[target_id] = {
+                        "tx_bytes": int(match[2]),
+                        "tx_packets": int(match[3]),
+                        "dropped": int(match[4]),
+                    }
     except Exception as e:
         print(f"Error reading tc stats: {e}")
 
@@ -214,14 +262,20 @@ def update_traffic_stats():
             state.traffic_stats["load_percent"] = min(100, round(100 * total_bytes_sec / bandwidth_bytes_sec, 1)) if bandwidth_bytes_sec > 0 else 0
 
             # Calculate per-link rates from tc stats (actual delivered traffic)
+            # Each peer's dict is updated in place rather than replaced
+            epochs = state.link_epochs
             for target_id, counters in link_counters.items():
-                prev_link = state.link_traffic.get(target_id, {})
-                prev_bytes = prev_link.get("tx_bytes", 0)
-                prev_packets = prev_link.get("tx_packets", 0)
-                prev_dropped = prev_link.get("dropped", 0)
-
-                # Handle counter reset (when rules are reapplied)
-                if counters["tx_bytes"] < prev_bytes:
+                link = state.link_traffic.get(target_id)
+                if link is None:
+                    link = state.link_traffic[target_id] = {}
+                prev_bytes = link.get("tx_bytes", 0)
+                prev_packets = link.get("tx_packets", 0)
+                prev_dropped = link.get("dropped", 0)
+
+                # Counters restart when the link's qdisc is recreated; the
+                # epoch says so exactly, the comparison catches anything else
+                epoch = epochs.get(target_id, 0)
+                if link.get("epoch") != epoch or counters["tx_bytes"] < prev_bytes:
                     prev_bytes = 0
                     prev_packets = 0
                     prev_dropped = 0
@@ -230,24 +284,33 @@ def update_traffic_stats():
                 tx_packets_sec = int((counters["tx_packets"] - prev_packets) / elapsed)
                 dropped_sec = int((counters["dropped"] - prev_dropped) / elapsed)
 
-                state.link_traffic[target_id] = {
-                    "tx_bytes": counters["tx_bytes"],
-                    "tx_packets": counters["tx_packets"],
-                    "dropped": counters["dropped"],
-                    "tx_bytes_sec": max(0, tx_bytes_sec),
-                    "tx_packets_sec": max(0, tx_packets_sec),
-                    "dropped_sec": max(0, dropped_sec),
-                }
+                link["tx_bytes"] = counters["tx_bytes"]
+                link["tx_packets"] = counters["tx_packets"]
+                link["dropped"] = counters["dropped"]
+                link["tx_bytes_sec"] = max(0, tx_bytes_sec)
+                link["tx_packets_sec"] = max(0, tx_packets_sec)
+                link["dropped_sec"] = max(0, dropped_sec)
+                link["epoch"] = epoch
 
     state.prev_traffic = current
     state.prev_time = now
 
-def get_drone_ip(drone_id):
-    """Get IP address of a drone's radio on the MANET."""
+def _format_drone_ip(drone_id):
     if drone_id == 0:
         return "172.31.0.10"  # Base station
     return f"172.31.0.1{drone_id}"
 
+# MANET IPs of the base station and every drone, built once
+DRONE_IPS = {i: _format_drone_ip(i) for i in range(0, DRONE_COUNT + 1)}
+
+def get_drone_ip(drone_id):
+    """Get IP address of a drone's radio on the MANET."""
+    ip = DRONE_IPS.get(drone_id)
+    if ip is None:
+        # Outside the configured swarm (e.g. an override for an unknown id)
+        ip = _format_drone_ip(drone_id)
+    return ip
+
 def get_other_drones():
     """Get list of reachable drone IDs based on topology.
 
@@ -255,65 +318,110 @@ def get_other_drones():
     drones reach each other *through* it, so each drone's peer list is
     the same as mesh (all other drones).  The base station itself is not
     a directly addressable peer.
+
+    The list is cached and shared between callers; don't modify it.
     """
-    if DRONE_ID == 0:
+    return _other_drones(DRONE_ID, DRONE_COUNT)
+
+@lru_cache(maxsize=4)
+def _other_drones(drone_id, drone_count):
+    if drone_id == 0:
         # Base station can reach all drones
-        return list(range(1, DRONE_COUNT + 1))
-    return [i for i in range(1, DRONE_COUNT + 1) if i != DRONE_ID]
+        return list(range(1, drone_count + 1))
+    return [i for i in range(1, drone_count + 1) if i != drone_id]
 
 def calculate_distance(pos1, pos2):
     """Calculate 3D Euclidean distance between two positions."""
-    dx = pos1.get("x", 0) - pos2.get("x", 0)
-    dy = pos1.get("y", 0) - pos2.get("y", 0)
-    dz = pos1.get("z", 0) - pos2.get("z", 0)
-    return math.sqrt(dx*dx + dy*dy + dz*dz)
-
-def interpolate_degradation(distance):
-    """Interpolate link quality based on distance using config thresholds."""
-    thresholds = CONFIG.get("distance", {}).get("thresholds", [])
-    max_range = CONFIG.get("distance", {}).get("max_range_m", 1000)
-
-    if distance >= max_range:
-        return None  # Out of range
-
-    if not thresholds:
-        return {"latency_ms": 10, "loss_percent": 0}
-
-    # Find surrounding thresholds
-    lower = thresholds[0]
-    upper = thresholds[-1]
-
-    for i, t in enumerate(thresholds):
-        if t["range_m"] <= distance:
-            lower = t
-        if t["range_m"] >= distance:
-            upper = t
-            break
+    # Stored positions always have x, y and z (see normalize_position)
+    return math.hypot(pos1["x"] - pos2["x"], pos1["y"] - pos2["y"], pos1["z"] - pos2["z"])
 
-    # Interpolate
-    if lower["range_m"] == upper["range_m"]:
-        return {"latency_ms": lower["latency_ms"], "loss_percent": lower["loss_percent"]}
+def load_thresholds(config):
+    """Sort the distance thresholds and split them into parallel lists.
 
-    ratio = (distance - lower["range_m"]) / (upper["range_m"] - lower["range_m"])
-    latency = lower["latency_ms"] + ratio * (upper["latency_ms"] - lower["latency_ms"])
-    loss = lower["loss_percent"] + ratio * (upper["loss_percent"] - lower["loss_percent"])
-
-    return {"latency_ms": latency, "loss_percent": loss}
+    Returns (range_m, latency_ms, loss_percent), the form build_interpolator
+    generates interpolate_degradation from.
+    """
+    thresholds = sorted(config.get("distance", {}).get("thresholds", []),
+                        key=lambda t: t["range_m"])
+    return (
+        [t["range_m"] for t in thresholds],
+        [t["latency_ms"] for t in thresholds],
+        [t["loss_percent"] for t in thresholds],
+    )
+
+THRESHOLDS = load_thresholds(CONFIG)
+
+def build_interpolator(thresholds, max_range):
+    """Generate interpolate_degradation for a fixed set of thresholds.
+
+    The thresholds only come from the config file, so they are baked into
+    the source of a specialised function: a chain of range comparisons with
+    the segment endpoints and widths as constants, instead of bisecting and
+    indexing the threshold lists on every call.
+    """
+    ranges, latencies, losses = thresholds
+    lines = [
+        "def interpolate_degradation(distance):",
+        '    """Interpolate link quality based on distance using config thresholds."""',
+        f"    if distance >= {max_range!r}:",
+        "        return None  # Out of range",
+    ]
+    if not ranges:
+        lines.append('    return {"latency_ms": 10, "loss_percent": 0}')
+    else:
+        # Before the first threshold
+        lines.append(f"    if distance < {ranges[0]!r}:")
+        lines.append(f'        return {{"latency_ms": {latencies[0]!r}, "loss_percent": {losses[0]!r}}}')
+        for i in range(1, len(ranges)):
+            lower = i - 1
+            width = ranges[i] - ranges[lower]
+            if not width:
+                continue
+            # ranges[lower] <= distance < ranges[i]; exactly on a threshold
+            # gives that threshold's values
+            lines.append(f"    if distance < {ranges[i]!r}:")
+            lines.append(f"        if distance == {ranges[lower]!r}:")
+            lines.append(f'            return {{"latency_ms": {latencies[lower]!r}, "loss_percent": {losses[lower]!r}}}')
+            lines.append(f"        ratio = (distance - {ranges[lower]!r}) / {width!r}")
+            lines.append(f'        return {{"latency_ms": {latencies[lower]!r} + ratio * {latencies[i] - latencies[lower]!r},')
+            lines.append(f'                "loss_percent": {losses[lower]!r} + ratio * {losses[i] - losses[lower]!r}}}')
+        # At or past the last threshold
+        lines.append(f'    return {{"latency_ms": {latencies[-1]!r}, "loss_percent": {losses[-1]!r}}}')
+
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["interpolate_degradation"]
+
+interpolate_degradation = build_interpolator(
+    THRESHOLDS, CONFIG.get("distance", {}).get("max_range_m", 1000))
+
+def environment_multipliers():
+    """Return the active environment's (latency, loss, bandwidth) multipliers.
+
+    Callers that evaluate many links resolve this once and pass it down,
+    instead of walking CONFIG's profile dicts for every link.
+    """
+    profiles = CONFIG.get("environment", {}).get("profiles", {})
+    profile = profiles.get(state.environment, {})
+    return (
+        profile.get("latency_multiplier", 1.0),
+        profile.get("loss_multiplier", 1.0),
+        profile.get("bandwidth_multiplier", 1.0),
+    )
 
-def apply_environment(base_quality):
+def apply_environment(base_quality, multipliers=None):
     """Apply environment multipliers to base link quality."""
     if base_quality is None:
         return None
 
-    profiles = CONFIG.get("environment", {}).get("profiles", {})
-    profile = profiles.get(state.environment, {"latency_multiplier": 1.0, "loss_multiplier": 1.0})
+    latency_mult, loss_mult, _ = multipliers or environment_multipliers()
 
-    latency = base_quality["latency_ms"] * profile.get("latency_multiplier", 1.0)
-    loss = min(100, base_quality["loss_percent"] * profile.get("loss_multiplier", 1.0))
+    latency = base_quality["latency_ms"] * latency_mult
+    loss = min(100, base_quality["loss_percent"] * loss_mult)
 
     return {"latency_ms": latency, "loss_percent": loss}
 
-def _direct_link_quality(src_id, dst_id):
+def _direct_link_quality(src_id, dst_id, multipliers=None):
     """Calculate single-hop link quality between two nodes."""
     if src_id not in state.positions or dst_id not in state.positions:
         return {"latency_ms": 10, "loss_percent": 0, "reachable": True, "distance_m": 0}
@@ -324,22 +432,25 @@ def _direct_link_quality(src_id, dst_id):
     if base_quality is None:
         return {"latency_ms": 0, "loss_percent": 100, "reachable": False, "distance_m": distance}
 
-    quality = apply_environment(base_quality)
+    quality = apply_environment(base_quality, multipliers)
     quality["reachable"] = True
     quality["distance_m"] = distance
     return quality
 
-def calculate_link_quality(target_id):
+def calculate_link_quality(target_id, multipliers=None, leg1=None):
     """Calculate link quality to a target drone based on distance, environment,
     and topology.
 
     In star mode, drone-to-drone traffic is routed through the base station
     (ID 0), so quality reflects the two-hop path: self -> base -> target.
-    Latencies add; losses compound.
+    Latencies add; losses compound. leg1 (self -> base) is the same for
+    every target, so callers looping over targets can pass it in.
     """
     if state.topology == "star" and DRONE_ID != 0 and target_id != 0:
-        leg1 = _direct_link_quality(DRONE_ID, 0)
-        leg2 = _direct_link_quality(0, target_id)
+        multipliers = multipliers or environment_multipliers()
+        if leg1 is None:
+            leg1 = _direct_link_quality(DRONE_ID, 0, multipliers)
+        leg2 = _direct_link_quality(0, target_id, multipliers)
 
         if not leg1["reachable"] or not leg2["reachable"]:
             total_dist = leg1.get("distance_m", 0) + leg2.get("distance_m", 0)
@@ -356,33 +467,50 @@ def calculate_link_quality(target_id):
             "distance_m": combined_distance,
         }
 
-    return _direct_link_quality(DRONE_ID, target_id)
+    return _direct_link_quality(DRONE_ID, target_id, multipliers)
 
-def get_radio_bandwidth():
+def get_radio_bandwidth(multipliers=None):
     """Get effective radio bandwidth considering environment and overrides."""
     if state.bandwidth_override is not None:
         return state.bandwidth_override
     base_bw = CONFIG.get("radio", {}).get("bandwidth_kbps", 1000)
-    profiles = CONFIG.get("environment", {}).get("profiles", {})
-    profile = profiles.get(state.environment, {})
-    multiplier = profile.get("bandwidth_multiplier", 1.0)
+    _, _, multiplier = multipliers or environment_multipliers()
     return int(base_bw * multiplier)
 
 # TC/HTB Management
-def run_cmd(cmd, check=False):
-    """Run shell command."""
+def run_cmd(argv, check=False):
+    """Run a command given as an argv list (no shell in between)."""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=5)
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=5)
         if check and result.returncode != 0:
-            print(f"Command failed: {cmd}\n{result.stderr}")
+            print(f"Command failed: {' '.join(argv)}\n{result.stderr}")
         return result.returncode == 0, result.stdout.strip()
     except subprocess.TimeoutExpired:
         return False, "timeout"
+    except OSError as e:
+        return False, str(e)
+
+def run_batch(argv, lines, check=False):
+    """Run a batch command (tc -batch, ip -batch) with lines on stdin.
+
+    One process applies every line, instead of a shell plus a tc/ip
+    process per rule.
+    """
+    try:
+        result = subprocess.run(argv, input="\n".join(lines) + "\n",
+                                capture_output=True, text=True, timeout=5)
+        if check and result.returncode != 0:
+            print(f"Command failed: {' '.join(argv)}\n{result.stderr}")
+        return result.returncode == 0, result.stdout.strip()
+    except subprocess.TimeoutExpired:
+        return False, "timeout"
+    except OSError as e:
+        return False, str(e)
 
 def get_manet_interface():
     """Find the network interface connected to the MANET mesh (172.31.0.x)."""
     try:
-        ok, output = run_cmd("ip -o addr show")
+        ok, output = run_cmd(["ip", "-o", "addr", "show"])
         if ok:
             for line in output.split("\n"):
                 if "172.31.0." in line:
@@ -397,9 +525,14 @@ def get_manet_interface():
 
 def setup_forwarding():
     """Enable IP forwarding for star-mode traffic relay through the base station."""
-    # Enable IP forwarding (needed for star-mode: base station forwards between drones)
-    run_cmd("sysctl -w net.ipv4.ip_forward=1")
-    run_cmd("iptables -P FORWARD ACCEPT")
+    # Enable IP forwarding (needed for star-mode: base station forwards between drones).
+    # Written straight to procfs, which is all sysctl -w does
+    try:
+        with open("/proc/sys/net/ipv4/ip_forward", "w") as f:
+            f.write("1")
+    except OSError as e:
+        print(f"Could not enable IP forwarding: {e}")
+    run_cmd(["iptables", "-P", "FORWARD", "ACCEPT"])
     print(f"IP forwarding enabled")
 
 
@@ -409,54 +542,103 @@ def setup_star_routes():
         return
 
     base_ip = get_drone_ip(0)
+    # One "ip -batch" process for all routes (-force: keep going past
+    # routes that already exist)
+    routes = []
     for target_id in range(1, DRONE_COUNT + 1):
         if target_id == DRONE_ID:
             continue
         target_ip = get_drone_ip(target_id)
-        run_cmd(f"ip route add {target_ip}/32 via {base_ip}")
+        routes.append(f"route add {target_ip}/32 via {base_ip}")
+    run_batch(["ip", "-force", "-batch", "-"], routes)
 
     print(f"Star routes configured: drone traffic routes via {base_ip}")
 
 
 MANET_INTERFACE = None  # Will be set at startup
 
-def setup_htb_root():
-    """Set up HTB qdisc for shared bandwidth control."""
-    interface = MANET_INTERFACE
-    bandwidth = get_radio_bandwidth()
+def htb_root_cmds(interface, bandwidth):
+    """tc batch lines that build a bare HTB root.
 
-    # Clear existing rules
-    run_cmd(f"tc qdisc del dev {interface} root 2>/dev/null")
+    Run after the old root qdisc is deleted, which removes every per-link
+    class, netem qdisc and filter under it in one go.
+    """
+    return [
+        # HTB root with total bandwidth limit
+        f"qdisc add dev {interface} root handle 1: htb default 99",
+        f"class add dev {interface} parent 1: classid 1:1 htb rate {bandwidth}kbit ceil {bandwidth}kbit",
+        # Default class for unclassified traffic
+        f"class add dev {interface} parent 1:1 classid 1:99 htb rate {bandwidth}kbit ceil {bandwidth}kbit",
+    ]
+
+def mark_htb_rebuild():
+    """Have the next apply_link_rules rebuild the HTB root and every link.
+
+    Nothing is sent to tc here; the root is rebuilt (with the current
+    bandwidth) in the same tc batch as the per-link classes.
+    """
+    state.applied_links = {}
 
-    # Create HTB root with total bandwidth limit
-    run_cmd(f"tc qdisc add dev {interface} root handle 1: htb default 99")
-    run_cmd(f"tc class add dev {interface} parent 1: classid 1:1 htb rate {bandwidth}kbit ceil {bandwidth}kbit")
+@lru_cache(maxsize=4096)
+def netem_args(latency, loss):
+    """netem arguments for a link's (latency ms, loss %), "" for a clean link.
 
-    # Default class for unclassified traffic
-    run_cmd(f"tc class add dev {interface} parent 1:1 classid 1:99 htb rate {bandwidth}kbit ceil {bandwidth}kbit")
+    The same integer pairs recur across applies, so each string is only
+    formatted once.
+    """
+    netem_params = []
+    if latency > 0:
+        jitter = max(1, latency // 10)
+        netem_params.append(f"delay {latency}ms {jitter}ms")
+    if loss > 0:
+        netem_params.append(f"loss {loss}%")
+    return " ".join(netem_params)
 
-    print(f"HTB root configured: {bandwidth} kbit/s total bandwidth")
+# Stand-in for links without an override (stored overrides have every key)
+NO_OVERRIDE = {"extra_latency_ms": 0, "extra_loss_percent": 0, "partition": False}
 
 def apply_link_rules():
-    """Apply tc rules for each link based on calculated quality."""
+    """Apply tc rules for each link based on calculated quality.
+
+    Returns False if tc rejected the rules.
+    """
     interface = MANET_INTERFACE
-    bandwidth = get_radio_bandwidth()
+    # Environment profile resolved once for every link below
+    multipliers = environment_multipliers()
+    bandwidth = get_radio_bandwidth(multipliers)
+
+    # In star mode the drone -> base station leg is shared by every link
+    star = state.topology == "star" and DRONE_ID != 0
+    leg1 = _direct_link_quality(DRONE_ID, 0, multipliers) if star else None
 
     # Recalculate all link qualities
     for target_id in range(0, DRONE_COUNT + 1):
         if target_id == DRONE_ID:
             continue
-        state.link_quality[target_id] = calculate_link_quality(target_id)
-
-    # Clear existing netem qdiscs, classes, and filters
-    for i in range(1, 20):
-        # Delete netem qdisc by parent (more reliable than by handle)
-        run_cmd(f"tc qdisc del dev {interface} parent 1:{10+i} 2>/dev/null")
-        run_cmd(f"tc class del dev {interface} classid 1:{10+i} 2>/dev/null")
-        run_cmd(f"tc filter del dev {interface} prio {i} 2>/dev/null")
-
-    # Clear the class mapping
-    state.tc_class_map = {}
+        state.link_quality[target_id] = calculate_link_quality(target_id, multipliers, leg1)
+
+    # All tc commands are collected and applied by one "tc -force -batch"
+    # process (-force keeps going past deletes of rules that don't exist)
+    tc_cmds = []
+
+    # Links already in the kernel are only changed where their parameters
+    # differ; a full rebuild (from a fresh HTB root) happens the first time
+    # and after mark_htb_rebuild
+    applied = state.applied_links
+    rebuild = not applied
+    if rebuild:
+        # Fails when there is no root yet, so it is kept out of the batch
+        # whose exit status decides whether the links count as applied
+        run_cmd(["tc", "qdisc", "del", "dev", interface, "root"])
+        tc_cmds.extend(htb_root_cmds(interface, bandwidth))
+    new_applied = {}
+
+    # New class mapping and the links whose tc counters restart, both
+    # published once tc has taken the batch (the stats thread reads them)
+    class_map = {}
+    restarted = set()
+    # Links this batch changes at all
+    changed = set()
 
     # Create class and netem qdisc for each peer.
     # Peers NOT in the reachable set (per topology) get 100% loss.
@@ -468,20 +650,22 @@ def apply_link_rules():
     # Pre-compute leg1 quality once for reuse, incorporating any
     # override the user set on the drone→BS link (target 0).
     star_leg1 = None
-    if state.topology == "star" and DRONE_ID != 0:
-        star_leg1 = _direct_link_quality(DRONE_ID, 0)
-        leg1_override = state.link_overrides.get(0, {})
-        if leg1_override.get("partition", False):
-            star_leg1 = {"latency_ms": 0, "loss_percent": 100, "reachable": False, "distance_m": star_leg1.get("distance_m", 0)}
-        elif leg1_override:
+    if star:
+        star_leg1 = leg1
+        leg1_override = state.link_overrides.get(0)
+        if leg1_override is None:
+            pass
+        elif leg1_override["partition"]:
+            star_leg1 = {"latency_ms": 0, "loss_percent": 100, "reachable": False, "distance_m": star_leg1["distance_m"]}
+        else:
             star_leg1 = dict(star_leg1)  # copy before mutating
-            star_leg1["latency_ms"] = star_leg1.get("latency_ms", 0) + int(leg1_override.get("extra_latency_ms", 0))
-            star_leg1["loss_percent"] = min(100, star_leg1.get("loss_percent", 0) + int(leg1_override.get("extra_loss_percent", 0)))
+            star_leg1["latency_ms"] = star_leg1["latency_ms"] + int(leg1_override["extra_latency_ms"])
+            star_leg1["loss_percent"] = min(100, star_leg1["loss_percent"] + int(leg1_override["extra_loss_percent"]))
 
     class_id = 10
     for target_id in all_peers:
-        quality = state.link_quality.get(target_id, {})
-        override = state.link_overrides.get(target_id, {})
+        quality = state.link_quality[target_id]
+        override = state.link_overrides.get(target_id, NO_OVERRIDE)
         target_ip = get_drone_ip(target_id)
 
         # For tc shaping, use leg1 quality in star mode (base station shapes leg2)
@@ -502,19 +686,19 @@ def apply_link_rules():
             # Absolute override from controller API - bypass distance calculation
             latency = int(state.direct_link_params.get("delay_ms", 0))
             loss = int(state.direct_link_params.get("loss_pct", 0))
-        elif not tc_quality.get("reachable", True) or override.get("partition", False):
+        elif not tc_quality["reachable"] or override["partition"]:
             # Unreachable or partitioned: use netem with 100% loss
             latency = 0
             loss = 100
         else:
             # Base quality + any overrides
-            latency = int(tc_quality.get("latency_ms", 10)) + int(override.get("extra_latency_ms", 0))
-            loss = min(100, int(tc_quality.get("loss_percent", 0)) + int(override.get("extra_loss_percent", 0)))
+            latency = int(tc_quality["latency_ms"]) + int(override["extra_latency_ms"])
+            loss = min(100, int(tc_quality["loss_percent"]) + int(override["extra_loss_percent"]))
 
         class_id += 1
 
         # Store mapping for traffic stats
-        state.tc_class_map[class_id] = target_id
+        class_map[class_id] = target_id
 
         # Use direct rate override if set, otherwise share parent bandwidth
         if state.direct_link_params and "rate_kbit" in state.direct_link_params:
@@ -523,33 +707,134 @@ def apply_link_rules():
         else:
             ceil_rate = bandwidth
 
-        # Create HTB class (shares parent bandwidth)
-        run_cmd(f"tc class add dev {interface} parent 1:1 classid 1:{class_id} htb rate 10kbit ceil {ceil_rate}kbit")
-
         # Add netem qdisc for latency/loss
-        netem_params = []
-        if latency > 0:
-            jitter = max(1, latency // 10)
-            netem_params.append(f"delay {latency}ms {jitter}ms")
-        if loss > 0:
-            netem_params.append(f"loss {loss}%")
+        netem_str = netem_args(latency, loss)
+
+        previous = applied.get(target_id)
+        new_applied[target_id] = (class_id, ceil_rate, netem_str)
 
-        if netem_params:
-            netem_str = " ".join(netem_params)
-            run_cmd(f"tc qdisc add dev {interface} parent 1:{class_id} handle {class_id}: netem {netem_str}")
+        if rebuild or previous is None:
+            # Fresh class and qdisc, so their counters start from zero
+            restarted.add(target_id)
+            changed.add(target_id)
 
-        # Filter to direct traffic to this class
-        run_cmd(f"tc filter add dev {interface} parent 1: protocol ip prio {class_id - 10} u32 match ip dst {target_ip}/32 flowid 1:{class_id}")
+            # Create HTB class (shares parent bandwidth)
+            tc_cmds.append(f"class add dev {interface} parent 1:1 classid 1:{class_id} htb rate 10kbit ceil {ceil_rate}kbit")
 
-    print(f"Applied link rules for {len(all_peers)} peers ({len(reachable_targets)} reachable)")
+            if netem_str:
+                tc_cmds.append(f"qdisc add dev {interface} parent 1:{class_id} handle {class_id}: netem {netem_str}")
+
+            # Filter to direct traffic to this class
+            tc_cmds.append(f"filter add dev {interface} parent 1: protocol ip prio {class_id - 10} u32 match ip dst {target_ip}/32 flowid 1:{class_id}")
+            continue
+
+        # Incremental update: the class and filter for this peer exist
+        _, prev_ceil, prev_netem = previous
+        if ceil_rate != prev_ceil:
+            changed.add(target_id)
+            tc_cmds.append(f"class change dev {interface} parent 1:1 classid 1:{class_id} htb rate 10kbit ceil {ceil_rate}kbit")
+        if netem_str != prev_netem:
+            changed.add(target_id)
+            if not (netem_str and prev_netem):
+                # The netem qdisc is being created or deleted (a replace of
+                # an existing one keeps its counters)
+                restarted.add(target_id)
+            if netem_str:
+                tc_cmds.append(f"qdisc replace dev {interface} parent 1:{class_id} handle {class_id}: netem {netem_str}")
+            else:
+                tc_cmds.append(f"qdisc del dev {interface} parent 1:{class_id}")
+
+    ok = True
+    if tc_cmds:
+        ok, _ = run_batch(["tc", "-force", "-batch", "-"], tc_cmds, check=True)
+
+    # Links only count as applied once tc has accepted them; after a failure
+    # the next apply rebuilds everything from a fresh root
+    state.applied_links = new_applied if ok else {}
+    if ok:
+        epochs = state.link_epochs
+        for target_id in restarted:
+            epochs[target_id] = epochs.get(target_id, 0) + 1
+        state.tc_class_map = class_map
+        # A changed link may work again: probe it on the next cycle rather
+        # than once its backoff runs out (unchanged links keep backing off)
+        backoff = state.probe_backoff
+        for target_id in changed:
+            backoff.pop(target_id, None)
+        print(f"Applied link rules for {len(all_peers)} peers ({len(reachable_targets)} reachable)")
+    else:
+        print("Failed to apply link rules, rebuilding on the next apply")
+    return ok
 
 # Probe functions
 probe_results = {}
 
-def probe_ping(target_id):
-    """Ping another drone."""
-    target_ip = get_drone_ip(target_id)
-    ok, output = run_cmd(f"ping -c 1 -W 1 {target_ip}")
+# Unprivileged ICMP echo socket (needs net.ipv4.ping_group_range to cover
+# our gid); None until first use, False if the kernel refuses it
+_icmp_sock = None
+_icmp_seq = itertools.count(1)
+
+def get_icmp_socket():
+    """Return the shared ICMP echo socket, or None if it is unavailable."""
+    global _icmp_sock
+    if _icmp_sock is None:
+        try:
+            _icmp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        except OSError as e:
+            print(f"ICMP socket unavailable ({e}), using ping command")
+            _icmp_sock = False
+    return _icmp_sock or None
+
+def probe_ping(target_id, timeout=1.0):
+    """Ping another drone, returning the RTT in ms or -1 on failure."""
+    return probe_ping_all([target_id], timeout)[target_id]
+
+def probe_ping_all(target_ids, timeout=1.0):
+    """Ping several drones at once, returning {target_id: RTT ms or -1}.
+
+    Every echo request goes out before any reply is awaited, so one round
+    takes about the slowest RTT (or the timeout) however many peers there
+    are, rather than the sum of them.
+    """
+    sock = get_icmp_socket()
+    if sock is None:
+        return {target_id: probe_ping_cmd(get_drone_ip(target_id)) for target_id in target_ids}
+
+    results = {target_id: -1 for target_id in target_ids}
+    # Echo request: type 8, code 0; the kernel fills in the identifier and
+    # checksum on a datagram ICMP socket and only hands us matching replies
+    pending = {}  # seq -> (target_id, send time)
+    for target_id in target_ids:
+        seq = next(_icmp_seq) & 0xFFFF
+        packet = bytes((8, 0, 0, 0, 0, 0, seq >> 8, seq & 0xFF))
+        try:
+            sock.sendto(packet, (get_drone_ip(target_id), 0))
+        except OSError:
+            continue
+        pending[seq] = (target_id, time.monotonic())
+
+    deadline = time.monotonic() + timeout
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        sock.settimeout(remaining)
+        try:
+            reply = sock.recv(64)
+        except OSError:
+            break
+        if len(reply) < 8 or reply[0] != 0:
+            continue
+        # Late replies to earlier (timed out) requests match nothing
+        sent = pending.pop(reply[6] << 8 | reply[7], None)
+        if sent is not None:
+            target_id, start = sent
+            results[target_id] = (time.monotonic() - start) * 1000
+    return results
+
+def probe_ping_cmd(target_ip):
+    """Ping via the ping command (fallback when ICMP sockets are not allowed)."""
+    ok, output = run_cmd(["ping", "-c", "1", "-W", "1", target_ip])
     if ok and "time=" in output:
         try:
             time_str = output.split("time=")[1].split()[0]
@@ -558,31 +843,62 @@ def probe_ping(target_id):
             pass
     return -1
 
+# Probe sockets kept open per peer across probe cycles. UDP sockets are
+# left unconnected so replies sent from another local address of the peer
+# still count; TCP connections are reused and only re-established after an
+# error or timeout
+_udp_socks = {}
+_tcp_socks = {}
+
+def _drop_socket(socks, target_id):
+    sock = socks.pop(target_id, None)
+    if sock is not None:
+        sock.close()
+
 def probe_tcp(target_id):
-    """Test TCP connectivity."""
-    target_ip = get_drone_ip(target_id)
+    """Test TCP connectivity over a persistent connection."""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        sock.connect((target_ip, 9000))
-        sock.send(b"PING\n")
+        sock = _tcp_socks.get(target_id)
+        if sock is None:
+            sock = socket.create_connection((get_drone_ip(target_id), 9000), timeout=1)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _tcp_socks[target_id] = sock
+        sock.sendall(b"PING\n")
         data = sock.recv(64)
-        sock.close()
-        return len(data) > 0
-    except (socket.error, socket.timeout):
+    except OSError:
+        # Includes timeouts: a late reply would be read by the next probe,
+        # so start over on a fresh connection
+        _drop_socket(_tcp_socks, target_id)
+        return False
+    if not data:
+        # Peer closed the connection
+        _drop_socket(_tcp_socks, target_id)
         return False
+    return True
 
 def probe_udp(target_id):
     """Test UDP connectivity."""
-    target_ip = get_drone_ip(target_id)
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock = _udp_socks.get(target_id)
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _udp_socks[target_id] = sock
+        # Discard late replies to earlier probes before sending a new one
+        sock.setblocking(False)
+        try:
+            while sock.recv(64):
+                pass
+        except OSError:
+            pass
         sock.settimeout(1)
-        sock.sendto(b"PING", (target_ip, 9001))
-        data, _ = sock.recvfrom(64)
-        sock.close()
+        sock.sendto(b"PING", (get_drone_ip(target_id), 9001))
+        data = sock.recv(64)
         return len(data) > 0
-    except (socket.error, socket.timeout):
+    except socket.timeout:
+        # Lost probe; the socket is still good (a late reply gets drained)
+        return False
+    except OSError:
+        _drop_socket(_udp_socks, target_id)
         return False
 
 def stats_loop():
@@ -592,38 +908,82 @@ def stats_loop():
         write_metrics()
         time.sleep(0.5)
 
+# Workers for the per-peer TCP and UDP probes (each peer's sockets are
+# only ever used by one probe at a time)
+_probe_pool = ThreadPoolExecutor(max_workers=max(1, 2 * DRONE_COUNT), thread_name_prefix="probe")
+
+# Longest wait between probes of a peer that keeps failing
+PROBE_BACKOFF_MAX = 60
+
+def probe_targets_due(targets, now):
+    """Targets to probe this cycle: all but those backing off after failures."""
+    backoff = state.probe_backoff
+    return [t for t in targets if t not in backoff or now >= backoff[t][0]]
+
+def record_probe_outcome(target_id, ok, now):
+    """Reset a target's backoff on success, or double its wait on failure."""
+    if ok:
+        state.probe_backoff.pop(target_id, None)
+        return
+    _, failures = state.probe_backoff.get(target_id, (0, 0))
+    failures += 1
+    delay = min(PROBE_BACKOFF_MAX, PROBE_INTERVAL * 2 ** failures)
+    state.probe_backoff[target_id] = (now + delay, failures)
+
 def probe_loop():
-    """Continuously probe other drones."""
+    """Continuously probe other drones.
+
+    A peer that fails every probe (ping, TCP and UDP) is probed with
+    exponential backoff, up to PROBE_BACKOFF_MAX seconds apart, until it
+    answers again; its last results stay in probe_results meanwhile.
+    """
     while True:
-        targets = get_other_drones()
-        for target_id in targets:
+        targets = probe_targets_due(get_other_drones(), time.monotonic())
+        # TCP and UDP probes for every peer run on the pool while this
+        # thread does the ping round, so a cycle is bounded by the slowest
+        # probe rather than the sum of all timeouts
+        tcp_futures = [_probe_pool.submit(probe_tcp, target_id) for target_id in targets]
+        udp_futures = [_probe_pool.submit(probe_udp, target_id) for target_id in targets]
+        pings = probe_ping_all(targets)
+        for target_id, tcp_future, udp_future in zip(targets, tcp_futures, udp_futures):
             quality = state.link_quality.get(target_id, {})
             link_traffic = state.link_traffic.get(target_id, {})
-            ping_ms = probe_ping(target_id)
-            tcp_ok = probe_tcp(target_id)
-            udp_ok = probe_udp(target_id)
-
-            probe_results[target_id] = {
-                "ping_ms": ping_ms,
-                "tcp_ok": tcp_ok,
-                "udp_ok": udp_ok,
-                "distance_m": quality.get("distance_m", 0),
-                "expected_latency_ms": quality.get("latency_ms", 0),
-                "expected_loss_percent": quality.get("loss_percent", 0),
-                "reachable": quality.get("reachable", True),
-                "timestamp": time.time(),
-                # Link traffic stats (from tc - actual delivered traffic)
-                "tx_bytes_sec": link_traffic.get("tx_bytes_sec", 0),
-                "tx_packets_sec": link_traffic.get("tx_packets_sec", 0),
-                "dropped_sec": link_traffic.get("dropped_sec", 0),
-            }
+            ping_ms = pings[target_id]
+            tcp_ok = tcp_future.result()
+            udp_ok = udp_future.result()
+            record_probe_outcome(target_id, ping_ms >= 0 or tcp_ok or udp_ok, time.monotonic())
+
+            # Each peer's result dict is updated in place rather than replaced
+            result = probe_results.get(target_id)
+            if result is None:
+                result = probe_results[target_id] = {}
+            result["ping_ms"] = ping_ms
+            result["tcp_ok"] = tcp_ok
+            result["udp_ok"] = udp_ok
+            result["distance_m"] = quality.get("distance_m", 0)
+            result["expected_latency_ms"] = quality.get("latency_ms", 0)
+            result["expected_loss_percent"] = quality.get("loss_percent", 0)
+            result["reachable"] = quality.get("reachable", True)
+            result["timestamp"] = time.time()
+            # Link traffic stats (from tc - actual delivered traffic)
+            result["tx_bytes_sec"] = link_traffic.get("tx_bytes_sec", 0)
+            result["tx_packets_sec"] = link_traffic.get("tx_packets_sec", 0)
+            result["dropped_sec"] = link_traffic.get("dropped_sec", 0)
+            invalidate_status()
 
         time.sleep(PROBE_INTERVAL)
 
+_metrics_paths = None  # (METRICS_DIR, metrics file, temp file), built once
+
 def write_metrics():
     """Write metrics to shared volume."""
-    METRICS_DIR.mkdir(parents=True, exist_ok=True)
-    metrics_file = METRICS_DIR / f"drone{DRONE_ID}.json"
+    global _metrics_paths
+    paths = _metrics_paths
+    if paths is None or paths[0] is not METRICS_DIR:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        metrics_file = METRICS_DIR / f"drone{DRONE_ID}.json"
+        paths = _metrics_paths = (METRICS_DIR, str(metrics_file), f"{metrics_file}.tmp")
+    _, metrics_file, tmp_file = paths
 
     data = {
         "drone_id": DRONE_ID,
@@ -633,54 +993,198 @@ def write_metrics():
         "topology": state.topology,
         "bandwidth_kbps": get_radio_bandwidth(),
         "probes": probe_results,
-        "link_quality": {str(k): v for k, v in state.link_quality.items()},
-        "link_overrides": {str(k): v for k, v in state.link_overrides.items()},
+        "link_quality": state.link_quality,
+        "link_overrides": state.link_overrides,
         "traffic": state.traffic_stats,
     }
 
-    tmp_file = metrics_file.with_suffix(".tmp")
-    with open(tmp_file, "w") as f:
-        json.dump(data, f)
-    tmp_file.rename(metrics_file)
+    # Encode once and publish with a single write + replace, so readers of
+    # the shared volume never see a partially written file
+    blob = dumps_json(data)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    try:
+        fd = os.open(tmp_file, flags, 0o644)
+    except FileNotFoundError:
+        # Metrics directory removed since it was created
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp_file, flags, 0o644)
+    try:
+        os.write(fd, blob)
+    finally:
+        os.close(fd)
+    os.replace(tmp_file, metrics_file)
 
 # TCP/UDP probe servers
-def start_tcp_server():
-    """TCP server for probing."""
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server.bind(("0.0.0.0", 9000))
-    server.listen(5)
-    while True:
-        try:
-            conn, _ = server.accept()
-            conn.recv(64)
-            conn.send(f"DRONE{DRONE_ID}_OK\n".encode())
-            conn.close()
-        except Exception:
-            pass
+class UDPProbeProtocol(asyncio.DatagramProtocol):
+    """UDP probe echo: answer every datagram with this drone's OK line."""
 
-def start_udp_server():
-    """UDP server for probing."""
-    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    server.bind(("0.0.0.0", 9001))
-    while True:
-        try:
-            data, addr = server.recvfrom(64)
-            server.sendto(f"DRONE{DRONE_ID}_OK\n".encode(), addr)
-        except Exception:
-            pass
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(f"DRONE{DRONE_ID}_OK\n".encode(), addr)
+
+async def handle_tcp_probe(reader, writer):
+    """TCP probe echo: reply with this drone's OK line to every request line.
+
+    The connection stays open, so a peer can reuse it across probe cycles.
+    """
+    reply = f"DRONE{DRONE_ID}_OK\n".encode()
+    try:
+        while await reader.readline():
+            writer.write(reply)
+            await writer.drain()
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+def start_probe_servers(tcp_port=9000, udp_port=9001):
+    """Serve TCP and UDP probes from a single asyncio event loop.
+
+    Replaces one blocking thread per protocol; a slow or silent TCP client
+    no longer holds up the other probes.
+    """
+    async def serve():
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(handle_tcp_probe, "0.0.0.0", tcp_port, reuse_address=True)
+        await loop.create_datagram_endpoint(UDPProbeProtocol, local_addr=("0.0.0.0", udp_port))
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
 
 # HTTP API
+# Requests are served on threads; handlers that change state and the
+# worker that re-applies tc rules are serialized by this lock
+state_lock = threading.Lock()
+
+# Link rule changes from POSTs and DELETEs are applied by apply_worker: a burst of
+# updates (e.g. a coordinator posting every drone's position) arriving
+# within APPLY_DEBOUNCE seconds becomes a single apply_link_rules
+APPLY_DEBOUNCE = 0.1
+_apply_event = threading.Event()
+
+def request_apply():
+    """Schedule apply_link_rules on the apply worker."""
+    _apply_event.set()
+
+def apply_worker():
+    """Apply link rules once per burst of request_apply calls."""
+    while True:
+        _apply_event.wait()
+        time.sleep(APPLY_DEBOUNCE)
+        # Requests made while rules are being applied trigger another pass
+        _apply_event.clear()
+        with state_lock:
+            try:
+                apply_link_rules()
+            except Exception as e:
+                # Keep the worker alive for the next request_apply
+                print(f"Error applying link rules: {e}")
+            invalidate_status()
+
+# /status is served from a cached JSON body, rebuilt only after the state
+# it reports has changed (invalidate_status bumps the version)
+_status_versions = itertools.count()
+_status_version = next(_status_versions)
+_status_cache = None  # (version, body bytes)
+_status_gzip = None  # (body it was compressed from, gzip bytes)
+_config_bodies = None  # (body, gzip body); CONFIG never changes at runtime
+
+def invalidate_status():
+    """Mark the cached /status body as stale."""
+    global _status_version
+    _status_version = next(_status_versions)
+
+def get_status_body():
+    """Return the /status JSON body, re-serializing only if it is stale."""
+    global _status_cache
+    cached = _status_cache
+    version = _status_version
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    body = dumps_json({
+        "drone_id": DRONE_ID,
+        "position": state.positions.get(DRONE_ID, {}),
+        "environment": state.environment,
+        "topology": state.topology,
+        "bandwidth_kbps": get_radio_bandwidth(),
+        "probes": probe_results,
+        "link_quality": state.link_quality,
+        "link_overrides": state.link_overrides,
+        "direct_link_params": state.direct_link_params,
+        "link_down": state.link_down,
+        "bandwidth_override": state.bandwidth_override,
+    })
+    _status_cache = (version, body)
+    return body
+
+def get_status_body_gzip():
+    """Return the /status body gzip-compressed, once per new body."""
+    global _status_gzip
+    body = get_status_body()
+    cached = _status_gzip
+    if cached is not None and cached[0] is body:
+        return cached[1]
+    # Level 1: most of the size win on repetitive JSON for little CPU
+    compressed = gzip.compress(body, compresslevel=1)
+    _status_gzip = (body, compressed)
+    return compressed
+
+def get_config_bodies():
+    """Return the /config body as (plain, gzip) bytes, built on first use."""
+    global _config_bodies
+    if _config_bodies is None:
+        body = dumps_json(CONFIG)
+        _config_bodies = (body, gzip.compress(body, compresslevel=1))
+    return _config_bodies
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header value allows a gzip response.
+
+    gzip (or *) must be listed with a q-value above 0, so "gzip;q=0"
+    refuses it.
+    """
+    allowed = False
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "gzip":
+            # An explicit gzip entry wins over *
+            return q > 0
+        allowed = q > 0
+    return allowed
+
 class RadioHandler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         pass
 
-    def send_json(self, data, status=200):
+    def send_body(self, body, status=200, gzipped=False, vary=False):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if vary:
+            # The encoding depends on Accept-Encoding, so caches must key on it
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        self.send_body(dumps_json(data), status)
 
     def do_OPTIONS(self):
         self.send_response(200)
@@ -690,41 +1194,57 @@ class RadioHandler(BaseHTTPRequestHandler):
         self.end_headers()
 
     def read_json(self):
+        """Request body as a dict; ValueError if it isn't a JSON object."""
         content_length = int(self.headers.get("Content-Length", 0))
-        if content_length:
-            return json.loads(self.rfile.read(content_length))
-        return {}
+        if not content_length:
+            return {}
+        data = loads_json(self.rfile.read(content_length))
+        if not isinstance(data, dict):
+            raise ValueError("body must be a JSON object")
+        return data
+
+    def accepts_gzip(self):
+        return accepts_gzip(self.headers.get("Accept-Encoding", ""))
 
     def do_GET(self):
         if self.path == "/status":
-            self.send_json({
-                "drone_id": DRONE_ID,
-                "position": state.positions.get(DRONE_ID, {}),
-                "environment": state.environment,
-                "topology": state.topology,
-                "bandwidth_kbps": get_radio_bandwidth(),
-                "probes": probe_results,
-                "link_quality": state.link_quality,
-                "link_overrides": state.link_overrides,
-                "direct_link_params": state.direct_link_params,
-                "link_down": state.link_down,
-                "bandwidth_override": state.bandwidth_override,
-            })
+            if self.accepts_gzip():
+                self.send_body(get_status_body_gzip(), gzipped=True, vary=True)
+            else:
+                self.send_body(get_status_body(), vary=True)
         elif self.path == "/config":
-            self.send_json(CONFIG)
+            body, gzip_body = get_config_bodies()
+            if self.accepts_gzip():
+                self.send_body(gzip_body, gzipped=True, vary=True)
+            else:
+                self.send_body(body, vary=True)
         else:
             self.send_json({"error": "not found"}, 404)
 
     def do_POST(self):
+        with state_lock:
+            try:
+                self.handle_post()
+            except (ValueError, TypeError) as e:
+                # Body that isn't JSON, or a field that isn't a number;
+                # handlers convert fields before storing any of them
+                self.send_json({"error": f"invalid request: {e}"}, 400)
+            finally:
+                invalidate_status()
+
+    def do_DELETE(self):
+        with state_lock:
+            try:
+                self.handle_delete()
+            finally:
+                invalidate_status()
+
+    def handle_post(self):
         if self.path == "/position":
             # Update this drone's position
             data = self.read_json()
-            state.positions[DRONE_ID] = {
-                "x": data.get("x", 0),
-                "y": data.get("y", 0),
-                "z": data.get("z", 0),
-            }
-            apply_link_rules()
+            state.positions[DRONE_ID] = normalize_position(data)
+            request_apply()
             self.send_json({"ok": True, "position": state.positions[DRONE_ID]})
 
         elif self.path == "/environment":
@@ -733,8 +1253,8 @@ class RadioHandler(BaseHTTPRequestHandler):
             profile = data.get("profile", "clear")
             if profile in CONFIG.get("environment", {}).get("profiles", {}):
                 state.environment = profile
-                setup_htb_root()  # Reconfigure bandwidth
-                apply_link_rules()
+                mark_htb_rebuild()  # Reconfigure bandwidth
+                request_apply()
                 self.send_json({"ok": True, "environment": state.environment})
             else:
                 self.send_json({"error": "unknown profile"}, 400)
@@ -745,7 +1265,7 @@ class RadioHandler(BaseHTTPRequestHandler):
             mode = data.get("mode", "mesh")
             if mode in ["mesh", "star"]:
                 state.topology = mode
-                apply_link_rules()
+                request_apply()
                 self.send_json({"ok": True, "topology": state.topology})
             else:
                 self.send_json({"error": "unknown topology"}, 400)
@@ -754,34 +1274,31 @@ class RadioHandler(BaseHTTPRequestHandler):
             # Update another drone's position (for coordinator)
             try:
                 target_id = int(self.path.split("/")[2])
-                data = self.read_json()
-                state.positions[target_id] = {
-                    "x": data.get("x", 0),
-                    "y": data.get("y", 0),
-                    "z": data.get("z", 0),
-                }
-                apply_link_rules()
-                self.send_json({"ok": True, "position": state.positions[target_id]})
             except (ValueError, IndexError):
                 self.send_json({"error": "invalid drone id"}, 400)
+                return
+            data = self.read_json()
+            state.positions[target_id] = normalize_position(data)
+            request_apply()
+            self.send_json({"ok": True, "position": state.positions[target_id]})
 
         elif self.path == "/link":
             # Set absolute tc netem params (controller API)
             data = self.read_json()
             state.direct_link_params = {
-                "delay_ms": data.get("delay_ms", 0),
-                "loss_pct": data.get("loss_pct", 0),
-                "rate_kbit": data.get("rate_kbit", get_radio_bandwidth()),
+                "delay_ms": int(data.get("delay_ms", 0)),
+                "loss_pct": int(data.get("loss_pct", 0)),
+                "rate_kbit": int(data.get("rate_kbit", get_radio_bandwidth())),
             }
             state.link_down = False
-            apply_link_rules()
+            request_apply()
             print(f"Direct link params set: {state.direct_link_params}")
             self.send_json({"ok": True, "params": state.direct_link_params})
 
         elif self.path == "/link_down":
             # Simulate drone out of range (100% loss)
             state.link_down = True
-            apply_link_rules()
+            request_apply()
             print("Link DOWN - 100% loss")
             self.send_json({"ok": True, "link_down": True})
 
@@ -789,7 +1306,7 @@ class RadioHandler(BaseHTTPRequestHandler):
             # Restore to normal operation
             state.link_down = False
             state.direct_link_params = {}
-            apply_link_rules()
+            request_apply()
             print("Link UP - restored to distance-based calculation")
             self.send_json({"ok": True, "link_down": False})
 
@@ -801,8 +1318,8 @@ class RadioHandler(BaseHTTPRequestHandler):
                 state.bandwidth_override = int(rate)
             else:
                 state.bandwidth_override = None
-            setup_htb_root()
-            apply_link_rules()
+            mark_htb_rebuild()
+            request_apply()
             print(f"Bandwidth override: {state.bandwidth_override}")
             self.send_json({"ok": True, "bandwidth_kbps": get_radio_bandwidth()})
 
@@ -814,26 +1331,27 @@ class RadioHandler(BaseHTTPRequestHandler):
                 self.send_json({"error": "target required"}, 400)
                 return
 
+            target_id = int(target_id)
             state.link_overrides[target_id] = {
-                "extra_latency_ms": data.get("extra_latency_ms", 0),
-                "extra_loss_percent": data.get("extra_loss_percent", 0),
-                "partition": data.get("partition", False),
+                "extra_latency_ms": int(data.get("extra_latency_ms", 0)),
+                "extra_loss_percent": int(data.get("extra_loss_percent", 0)),
+                "partition": bool(data.get("partition", False)),
             }
-            apply_link_rules()
+            request_apply()
             print(f"Link override set for target {target_id}: {state.link_overrides[target_id]}")
             self.send_json({"ok": True, "override": state.link_overrides[target_id]})
 
         else:
             self.send_json({"error": "not found"}, 404)
 
-    def do_DELETE(self):
+    def handle_delete(self):
         if self.path.startswith("/link_override/"):
             # Clear link quality override
             try:
                 target_id = int(self.path.split("/")[2])
                 if target_id in state.link_overrides:
                     del state.link_overrides[target_id]
-                    apply_link_rules()
+                    request_apply()
                     print(f"Link override cleared for target {target_id}")
                 self.send_json({"ok": True})
             except (ValueError, IndexError):
@@ -859,20 +1377,17 @@ def main():
     setup_star_routes()
 
     # Set up traffic control on the MANET interface
-    setup_htb_root()
+    mark_htb_rebuild()
     apply_link_rules()
 
-    # Set up iptables accounting for per-link traffic stats
-    setup_iptables_accounting()
-
     # Start servers
-    threading.Thread(target=start_tcp_server, daemon=True).start()
-    threading.Thread(target=start_udp_server, daemon=True).start()
+    threading.Thread(target=start_probe_servers, daemon=True).start()
     threading.Thread(target=stats_loop, daemon=True).start()
     threading.Thread(target=probe_loop, daemon=True).start()
+    threading.Thread(target=apply_worker, daemon=True).start()
 
     # Start HTTP API
-    server = HTTPServer(("0.0.0.0", 8080), RadioHandler)
+    server = ThreadingHTTPServer(("0.0.0.0", 8080), RadioHandler)
     print("Radio API listening on port 8080")
     server.serve_forever()
 
@@ -2,6 +2,9 @@
 
 import os
 import sys
+import threading
+from http.server import ThreadingHTTPServer
+
 import pytest
 
 # Set required env vars before importing radio
@@ -36,8 +39,23 @@ def reset_state():
     }
     radio.state.link_traffic = {}
     radio.state.tc_class_map = {}
+    radio.state.applied_links = {}
+    radio.state.link_epochs = {}
+    radio.state.probe_backoff = {}
 
     # Re-initialize positions
     radio.init_positions()
+    radio.invalidate_status()
 
     yield
+
+
+@pytest.fixture
+def api():
+    """Port of a radio HTTP API served from a background thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), radio.RadioHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
@@ -1,5 +1,9 @@
 """Unit tests for radio.py pure functions."""
 
+import gzip
+import http.client
+import json
+
 import radio
 
 
@@ -28,7 +32,8 @@ class TestCalculateDistance:
 
     def test_missing_keys_default_to_zero(self):
         expected = 5.0
-        result = radio.calculate_distance({"x": 3, "y": 4}, {"x": 0})
+        result = radio.calculate_distance(radio.normalize_position({"x": 3, "y": 4}),
+                                          radio.normalize_position({"x": 0}))
         assert abs(result - expected) < 1e-10
 
 
@@ -65,6 +70,17 @@ class TestInterpolateDegradation:
         assert result is None
 
 
+    def test_load_thresholds_sorts_by_range(self):
+        config = {"distance": {"thresholds": [
+            {"range_m": 500, "latency_ms": 30, "loss_percent": 10},
+            {"range_m": 0, "latency_ms": 2, "loss_percent": 0},
+        ]}}
+        ranges, latencies, losses = radio.load_thresholds(config)
+        assert ranges == [0, 500]
+        assert latencies == [2, 30]
+        assert losses == [0, 10]
+
+
 class TestApplyEnvironment:
     def test_none_passthrough(self):
         result = radio.apply_environment(None)
@@ -115,6 +131,17 @@ class TestApplyEnvironment:
         assert result["loss_percent"] <= 100
 
 
+    def test_explicit_multipliers(self):
+        base = {"latency_ms": 10, "loss_percent": 5}
+        result = radio.apply_environment(base, (2.0, 3.0, 1.0))
+        assert result["latency_ms"] == 20.0
+        assert result["loss_percent"] == 15.0
+
+    def test_unknown_profile_multipliers_default_to_one(self):
+        radio.state.environment = "no-such-profile"
+        assert radio.environment_multipliers() == (1.0, 1.0, 1.0)
+
+
 class TestGetRadioBandwidth:
     def test_clear_returns_base(self):
         expected = radio.CONFIG.get("radio", {}).get("bandwidth_kbps", 1000)
@@ -292,3 +319,299 @@ class TestLinkDownUp:
         # The link_down flag is checked in apply_link_rules
         # Verify the flag is set
         assert radio.state.link_down is True
+
+
+class TestBatchedRules:
+    def test_apply_link_rules_single_tc_batch(self, monkeypatch):
+        calls = []
+        cmds = []
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: calls.append((argv, lines)) or (True, ""))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: cmds.append(argv) or (False, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        assert radio.apply_link_rules() is True
+
+        assert len(calls) == 1
+        argv, lines = calls[0]
+        assert argv[:3] == ["tc", "-force", "-batch"]
+        assert all(not line.startswith("tc ") for line in lines)
+        assert any(line.startswith("filter add dev eth1") and "172.31.0.12/32" in line for line in lines)
+        # Full rebuild starts from a fresh root instead of per-class deletes
+        assert cmds == [["tc", "qdisc", "del", "dev", "eth1", "root"]]
+        assert lines[0] == "qdisc add dev eth1 root handle 1: htb default 99"
+        assert not any(line.startswith(("class del", "filter del")) for line in lines)
+
+    def test_apply_link_rules_only_sends_changes(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: calls.append((argv, lines)) or (True, ""))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        radio.state.positions[1] = {"x": 0, "y": 0, "z": 0}
+        radio.state.positions[2] = {"x": 10, "y": 0, "z": 0}
+        radio.state.positions[3] = {"x": 20, "y": 0, "z": 0}
+        radio.apply_link_rules()
+        assert len(calls) == 1
+
+        # Nothing changed: no tc process at all
+        radio.apply_link_rules()
+        assert len(calls) == 1
+
+        # One peer moved: only its netem qdisc is replaced
+        radio.state.positions[3] = {"x": 600, "y": 0, "z": 0}
+        radio.apply_link_rules()
+        assert len(calls) == 2
+        lines = calls[1][1]
+        assert len(lines) == 1
+        assert lines[0].startswith("qdisc replace dev eth1 parent 1:13 handle 13: netem")
+
+    def test_failed_batch_forces_rebuild(self, monkeypatch):
+        calls = []
+        results = iter([(True, ""), (False, ""), (True, "")])
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: calls.append(lines) or next(results))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        radio.state.positions[1] = {"x": 0, "y": 0, "z": 0}
+        radio.state.positions[3] = {"x": 20, "y": 0, "z": 0}
+        assert radio.apply_link_rules() is True
+
+        radio.state.positions[3] = {"x": 600, "y": 0, "z": 0}
+        assert radio.apply_link_rules() is False
+        assert radio.state.applied_links == {}
+
+        # The rejected change is not taken as applied: everything is rebuilt
+        radio.apply_link_rules()
+        assert calls[2][0] == "qdisc add dev eth1 root handle 1: htb default 99"
+
+    def test_failed_batch_keeps_epochs_and_class_map(self, monkeypatch):
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: (False, ""))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        radio.apply_link_rules()
+        assert radio.state.link_epochs == {}
+        assert radio.state.tc_class_map == {}
+
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: (True, ""))
+        radio.apply_link_rules()
+        assert radio.state.link_epochs[2] == 1
+        assert radio.state.tc_class_map[12] == 2
+
+
+class TestNetemArgs:
+    def test_delay_and_loss(self):
+        assert radio.netem_args(30, 10) == "delay 30ms 3ms loss 10%"
+        assert radio.netem_args(5, 0) == "delay 5ms 1ms"
+        assert radio.netem_args(0, 100) == "loss 100%"
+
+    def test_clean_link_is_empty(self):
+        assert radio.netem_args(0, 0) == ""
+
+
+class TestStatusCache:
+    def test_body_reused_until_invalidated(self):
+        radio.invalidate_status()
+        first = radio.get_status_body()
+        assert radio.get_status_body() is first
+
+        radio.state.environment = "storm"
+        radio.invalidate_status()
+        second = radio.get_status_body()
+        assert second is not first
+        assert json.loads(second)["environment"] == "storm"
+
+
+    def test_gzip_body_follows_status_body(self):
+        radio.invalidate_status()
+        compressed = radio.get_status_body_gzip()
+        assert radio.get_status_body_gzip() is compressed
+        assert gzip.decompress(compressed) == radio.get_status_body()
+
+        radio.invalidate_status()
+        radio.state.environment = "fog"
+        assert json.loads(gzip.decompress(radio.get_status_body_gzip()))["environment"] == "fog"
+
+    def test_accepts_gzip_q_values(self):
+        assert radio.accepts_gzip("gzip, deflate, br")
+        assert radio.accepts_gzip("deflate, gzip;q=0.5")
+        assert radio.accepts_gzip("*")
+        assert not radio.accepts_gzip("")
+        assert not radio.accepts_gzip("gzip;q=0")
+        assert not radio.accepts_gzip("gzip;q=0.0, *;q=1")
+        assert not radio.accepts_gzip("x-gzipped")
+        assert not radio.accepts_gzip("*;q=0")
+
+    def test_status_varies_on_accept_encoding(self, api):
+        conn = http.client.HTTPConnection("127.0.0.1", api)
+        conn.request("GET", "/status", headers={"Accept-Encoding": "gzip;q=0"})
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        assert response.getheader("Vary") == "Accept-Encoding"
+        assert response.getheader("Content-Encoding") is None
+        assert json.loads(body)["environment"] == "clear"
+
+
+class TestWriteMetrics:
+    def test_replaces_file_atomically(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(radio, "METRICS_DIR", tmp_path)
+        radio.state.link_quality = {2: {"reachable": True}}
+        radio.write_metrics()
+        assert [p.name for p in tmp_path.iterdir()] == ["drone1.json"]
+        data = json.loads((tmp_path / "drone1.json").read_text())
+        assert data["drone_id"] == 1
+        assert data["link_quality"] == {"2": {"reachable": True}}
+
+    def test_recreates_removed_directory(self, tmp_path, monkeypatch):
+        metrics_dir = tmp_path / "metrics"
+        monkeypatch.setattr(radio, "METRICS_DIR", metrics_dir)
+        radio.write_metrics()
+        (metrics_dir / "drone1.json").unlink()
+        metrics_dir.rmdir()
+        radio.write_metrics()
+        assert (metrics_dir / "drone1.json").exists()
+
+
+class TestUpdateTrafficStats:
+    def test_link_traffic_updated_in_place(self, monkeypatch):
+        counters = {2: {"tx_bytes": 1000, "tx_packets": 10, "dropped": 0}}
+        monkeypatch.setattr(radio, "read_interface_stats",
+                            lambda: {"rx_bytes": 0, "rx_packets": 0, "tx_bytes": 0, "tx_packets": 0})
+        monkeypatch.setattr(radio, "read_tc_class_stats", lambda: counters)
+        radio.state.prev_time = radio.time.time() - 1
+        radio.update_traffic_stats()
+        link = radio.state.link_traffic[2]
+
+        counters[2] = {"tx_bytes": 3000, "tx_packets": 30, "dropped": 1}
+        radio.state.prev_time = radio.time.time() - 1
+        radio.update_traffic_stats()
+        assert radio.state.link_traffic[2] is link
+        assert link["tx_bytes"] == 3000
+        assert 1900 <= link["tx_bytes_sec"] <= 2000
+
+    def test_new_epoch_restarts_counters(self, monkeypatch):
+        counters = {2: {"tx_bytes": 1000, "tx_packets": 10, "dropped": 0}}
+        monkeypatch.setattr(radio, "read_interface_stats",
+                            lambda: {"rx_bytes": 0, "rx_packets": 0, "tx_bytes": 0, "tx_packets": 0})
+        monkeypatch.setattr(radio, "read_tc_class_stats", lambda: counters)
+        radio.state.prev_time = radio.time.time() - 1
+        radio.update_traffic_stats()
+
+        # Qdisc recreated and already past the old total: still a restart
+        radio.state.link_epochs[2] = 1
+        counters[2] = {"tx_bytes": 1500, "tx_packets": 15, "dropped": 0}
+        radio.state.prev_time = radio.time.time() - 1
+        radio.update_traffic_stats()
+        assert 1400 <= radio.state.link_traffic[2]["tx_bytes_sec"] <= 1500
+
+
+class TestReadTcClassStats:
+    def test_parses_netem_qdiscs(self, monkeypatch):
+        output = (
+            "qdisc htb 1: root refcnt 2 r2q 10 default 0x99 direct_packets_stat 0\n"
+            " Sent 500 bytes 5 pkt (dropped 0, overlimits 0 requeues 0)\n"
+            "qdisc netem 11: parent 1:11 limit 1000 delay 5ms  1ms loss 1%\n"
+            " Sent 169486 bytes 2422 pkt (dropped 22, overlimits 0 requeues 0)\n"
+            " backlog 0b 0p requeues 0\n"
+            "qdisc netem 12: parent 1:12 limit 1000 loss 100%\n"
+            " Sent 0 bytes 0 pkt (dropped 7, overlimits 0 requeues 0)\n"
+            "qdisc netem 19: parent 1:19 limit 1000\n"
+            " Sent 9 bytes 1 pkt (dropped 0, overlimits 0 requeues 0)\n"
+        )
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, output))
+        radio.state.tc_class_map = {11: 0, 12: 2}
+        assert radio.read_tc_class_stats() == {
+            0: {"tx_bytes": 169486, "tx_packets": 2422, "dropped": 22},
+            2: {"tx_bytes": 0, "tx_packets": 0, "dropped": 7},
+        }
+
+
+class TestProbeBackoff:
+    def test_failures_back_off_exponentially(self):
+        radio.record_probe_outcome(2, False, 100.0)
+        assert radio.probe_targets_due([2, 3], 100.0) == [3]
+        assert radio.probe_targets_due([2, 3], 100.0 + 2 * radio.PROBE_INTERVAL) == [2, 3]
+
+        radio.record_probe_outcome(2, False, 110.0)
+        assert radio.state.probe_backoff[2] == (110.0 + 4 * radio.PROBE_INTERVAL, 2)
+
+    def test_backoff_is_capped(self):
+        for _ in range(20):
+            radio.record_probe_outcome(2, False, 0.0)
+        assert radio.state.probe_backoff[2][0] == radio.PROBE_BACKOFF_MAX
+
+    def test_success_resets(self):
+        radio.record_probe_outcome(2, False, 0.0)
+        radio.record_probe_outcome(2, True, 1.0)
+        assert radio.probe_targets_due([2], 1.0) == [2]
+        assert 2 not in radio.state.probe_backoff
+
+    def test_apply_resets_only_changed_links(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: calls.append(lines) or (True, ""))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        radio.state.positions[1] = {"x": 0, "y": 0, "z": 0}
+        radio.state.positions[2] = {"x": 10, "y": 0, "z": 0}
+        radio.state.positions[3] = {"x": 20, "y": 0, "z": 0}
+        radio.apply_link_rules()
+
+        radio.record_probe_outcome(2, False, 0.0)
+        radio.record_probe_outcome(3, False, 0.0)
+        backoff = dict(radio.state.probe_backoff)
+
+        # Nothing changed (e.g. the same position posted again)
+        radio.apply_link_rules()
+        assert len(calls) == 1
+        assert radio.state.probe_backoff == backoff
+
+        # Peer 3's link changed: only it is probed again straight away
+        radio.state.positions[3] = {"x": 600, "y": 0, "z": 0}
+        radio.apply_link_rules()
+        assert len(calls) == 2
+        assert radio.state.probe_backoff == {2: backoff[2]}
+
+    def test_failed_apply_keeps_backoff(self, monkeypatch):
+        monkeypatch.setattr(radio, "run_batch", lambda argv, lines, check=False: (False, ""))
+        monkeypatch.setattr(radio, "run_cmd", lambda argv, check=False: (True, ""))
+        monkeypatch.setattr(radio, "MANET_INTERFACE", "eth1")
+        radio.record_probe_outcome(2, False, 0.0)
+        radio.apply_link_rules()
+        assert 2 in radio.state.probe_backoff
+
+
+def post_json(port, path, data):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", path, body=json.dumps(data), headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    conn.close()
+    return response.status, body
+
+
+class TestPostValidation:
+    def test_non_numeric_override_rejected(self, api):
+        status, body = post_json(api, "/link_override", {"target": 2, "extra_latency_ms": None})
+        assert status == 400
+        assert "error" in body
+        assert radio.state.link_overrides == {}
+
+    def test_override_fields_coerced(self, api):
+        status, body = post_json(api, "/link_override", {"target": "2", "extra_latency_ms": "15"})
+        assert status == 200
+        assert radio.state.link_overrides[2]["extra_latency_ms"] == 15
+
+    def test_non_numeric_position_rejected(self, api):
+        before = dict(radio.state.positions)
+        status, _ = post_json(api, "/positions/2", {"x": "north", "y": 0})
+        assert status == 400
+        assert radio.state.positions == before
+
+    def test_non_object_body_rejected(self, api):
+        for body in ([1], "x", 3):
+            status, response = post_json(api, "/link", body)
+            assert status == 400
+            assert "error" in response
+        assert radio.state.direct_link_params == {}
+
+    def test_non_numeric_bandwidth_rejected(self, api):
+        status, _ = post_json(api, "/bandwidth", {"rate_kbit": [1]})
+        assert status == 400
+        assert radio.state.bandwidth_override is None